@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import time
+import threading
+from scraper import ZhihuScraper
+from pdf_generator import PDFGenerator, PDFRenderPool
+from driver_pool import DriverPool
+from concurrency import AdaptiveConcurrency
+from metadata_store import MetadataStore
+from pipeline import Pipeline
+from config import (BLOCK_RETRY_TIMES, PIPELINE_PARSE_WORKERS, PIPELINE_IMAGE_WORKERS, PIPELINE_RENDER_WORKERS,
+                    PDF_RENDER_PROCESSES)
+from utils import clean_filename, extract_question_answer_ids
+
+
+def load_jobs(job_file):
+    """读取批量任务文件，支持纯URL列表或JSONL（每行一个含url字段的JSON对象）"""
+    jobs = []
+    with open(job_file, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            
+            record = {}
+            if line.startswith('{'):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"⚠️ 第{line_no}行JSON格式错误，已跳过: {e}")
+                    continue
+                url = record.get('url') or find_zhihu_url(record)
+            else:
+                url = line
+            
+            # 纯文本行和JSON中的url字段同样要求是知乎回答URL
+            _, answer_id = extract_question_answer_ids(url) if url else (None, None)
+            if not answer_id:
+                print(f"⚠️ 第{line_no}行没有知乎URL，已跳过")
+                continue
+            
+            job_id = str(record.get('id') or record.get('request_id') or answer_id)
+            jobs.append({'id': job_id, 'url': url, 'output': record.get('output')})
+    
+    return jobs
+
+
+def find_zhihu_url(record):
+    """在JSON记录的字符串字段中查找第一个知乎回答URL"""
+    for value in record.values():
+        if isinstance(value, str):
+            match = re.search(r'https?://www\.zhihu\.com/question/\d+/answer/\d+', value)
+            if match:
+                return match.group(0)
+    return None
+
+
+def load_completed_jobs(manifest_path):
+    """从结果清单中读取已成功完成的任务ID"""
+    completed = set()
+    if not os.path.exists(manifest_path):
+        return completed
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get('status') == 'ok':
+                completed.add(result['id'])
+    return completed
+
+
+class BatchRunner:
+    """批量处理：所有任务共用一个爬虫、浏览器池和PDF生成器
+
+    任务经过 加载页面 → 解析 → 下载图片 → 生成PDF 四个阶段的流水线，
+    I/O密集的抓取和CPU密集的PDF生成同时进行。
+    """
+
+    def __init__(self, cookies=None, output_dir='downloads', concurrency=2,
+                 manifest_path=None, scraper_options=None, incremental=False, render_processes=None):
+        self.output_dir = output_dir
+        self.concurrency = max(1, concurrency)
+        self.manifest_path = manifest_path or os.path.join(output_dir, 'batch_manifest.jsonl')
+        self.manifest_lock = threading.Lock()
+        # concurrency是上限，实际并发数由AIMD控制器根据拦截情况调整
+        self.controller = AdaptiveConcurrency(self.concurrency)
+        scraper_options = scraper_options or {}
+        self.driver_pool = DriverPool(cookies, size=self.concurrency,
+                                      capture_images=scraper_options.get('capture_images'))
+        # 增量模式：回答未变化时跳过图片下载和PDF生成
+        self.metadata_store = MetadataStore() if incremental else None
+        self.scraper = ZhihuScraper(cookies, driver_pool=self.driver_pool,
+                                    metadata_store=self.metadata_store, **scraper_options)
+        # 多进程渲染时每个渲染线程对应一个进程
+        self.render_processes = PDF_RENDER_PROCESSES if render_processes is None else render_processes
+        if self.render_processes > 0:
+            self.pdf_generator = PDFRenderPool(self.render_processes, scraper_options.get('image_dpi'))
+            self.render_workers = self.render_processes
+        else:
+            self.pdf_generator = PDFGenerator(scraper_options.get('image_dpi'))
+            self.render_workers = PIPELINE_RENDER_WORKERS
+        os.makedirs(output_dir, exist_ok=True)
+
+    def run(self, jobs, resume=True):
+        """执行任务列表，返回本次运行的结果列表"""
+        if resume:
+            completed = load_completed_jobs(self.manifest_path)
+            skipped = [job for job in jobs if job['id'] in completed]
+            jobs = [job for job in jobs if job['id'] not in completed]
+            if skipped:
+                print(f"⏭️ 跳过 {len(skipped)} 个已完成的任务")
+        
+        print(f"🚀 开始批量处理 {len(jobs)} 个任务 (并发数: {self.concurrency})")
+        start_time = time.time()
+        if jobs and self.scraper.engine == 'browser':
+            # 只用浏览器抓取时先启动所有实例；auto模式只在HTTP失败时才用浏览器，按需启动
+            self.driver_pool.warm_up()
+        try:
+            results = self.run_pipeline(self.new_item(job) for job in jobs)
+        finally:
+            self.close()
+        
+        success = sum(1 for r in results if r['status'] == 'ok')
+        unchanged = sum(1 for r in results if r['status'] == 'unchanged')
+        print(f"📊 批量处理完成: 成功 {success}/{len(results)}，未变化跳过 {unchanged}，耗时 {time.time() - start_time:.1f}s")
+        print(f"📄 结果清单: {self.manifest_path}")
+        return results
+
+    def run_question(self, question_id, resume=True, limit=None):
+        """爬取整个问题：边翻页边生成PDF，每个回答完成后立即写入清单"""
+        skip_ids = load_completed_jobs(self.manifest_path) if resume else set()
+        if skip_ids:
+            print(f"⏭️ 跳过 {len(skip_ids)} 个已完成的回答")
+        
+        print(f"🚀 开始爬取问题 {question_id} 的所有回答 (并发数: {self.concurrency})")
+        start_time = time.time()
+        
+        def answer_items():
+            # 回答接口已返回正文，直接从下载图片阶段开始；流水线的背压决定翻页速度
+            answers = self.scraper.iter_question_answers(question_id, skip_ids=skip_ids, limit=limit)
+            for article_data in answers:
+                _, answer_id = extract_question_answer_ids(article_data['url'])
+                job = {'id': answer_id, 'url': article_data['url'], 'output': None}
+                yield self.new_item(job, article_data)
+        
+        try:
+            results = self.run_pipeline(answer_items())
+        finally:
+            self.close()
+        
+        success = sum(1 for r in results if r['status'] == 'ok')
+        unchanged = sum(1 for r in results if r['status'] == 'unchanged')
+        print(f"📊 问题爬取完成: 成功 {success}/{len(results)}，未变化跳过 {unchanged}，耗时 {time.time() - start_time:.1f}s")
+        print(f"📄 结果清单: {self.manifest_path}")
+        return results
+
+    def run_pipeline(self, items):
+        """让条目依次经过各阶段，返回按完成顺序排列的结果"""
+        pipeline = Pipeline([
+            ('页面', self.stage_fetch, self.concurrency),
+            ('解析', self.stage_parse, PIPELINE_PARSE_WORKERS),
+            ('图片', self.stage_images, PIPELINE_IMAGE_WORKERS),
+            ('PDF', self.stage_render, self.render_workers),
+        ], on_done=self.finish_item)
+        return [item['result'] for item in pipeline.run(items)]
+
+    def new_item(self, job, article_data=None):
+        """创建流水线条目；已提供article_data时跳过加载页面和解析阶段"""
+        item = {
+            'job': job,
+            'start_time': time.time(),
+            'result': {'id': job['id'], 'url': job['url'], 'status': 'failed', 'pdf_path': None, 'error': None},
+        }
+        if article_data is not None:
+            item['article_data'] = article_data
+        return item
+
+    def stage_fetch(self, item):
+        """加载页面，被拦截时由并发控制器降速、暂停后重试"""
+        if 'article_data' in item:
+            return
+        job = item['job']
+        print(f"🔄 [{job['id']}] 开始: {job['url']}")
+        for attempt in range(BLOCK_RETRY_TIMES + 1):
+            with self.controller.slot():
+                page = self.scraper.fetch_page(job['url'])
+            if not page['block_state']:
+                item['page'] = page
+                return
+            self.controller.on_block(page['block_state'])
+            if attempt < BLOCK_RETRY_TIMES:
+                print(f"🔁 [{job['id']}] 暂停结束后重试 ({attempt + 1}/{BLOCK_RETRY_TIMES})")
+        self.mark_blocked(item, page['block_state'])
+
+    def stage_parse(self, item):
+        if 'article_data' in item:
+            return
+        page = item.pop('page')
+        article_data = self.scraper.parse_page(page)
+        if page['block_state']:
+            self.controller.on_block(page['block_state'])
+            self.mark_blocked(item, page['block_state'])
+            return
+        if not article_data or not (article_data['content'] or article_data.get('unchanged')):
+            item['result']['error'] = '提取文章内容失败'
+            item['done'] = True
+            return
+        self.controller.on_success()
+        item['article_data'] = article_data
+
+    def stage_images(self, item):
+        article_data = item['article_data']
+        if article_data.get('unchanged'):
+            item['result'].update(status='unchanged', title=article_data['title'], pdf_path=article_data['pdf_path'])
+            item['done'] = True
+            return
+        self.scraper.fetch_article_images(article_data)
+
+    def stage_render(self, item):
+        article_data = item.pop('article_data')
+        job = item['job']
+        result = item['result']
+        result['title'] = article_data['title']
+        output_path = job.get('output') or os.path.join(self.output_dir, self.output_name(job, article_data))
+        pdf_path = self.pdf_generator.generate_pdf(article_data, output_path)
+        if pdf_path:
+            result['status'] = 'ok'
+            result['pdf_path'] = pdf_path
+            if self.metadata_store:
+                self.metadata_store.record(article_data, pdf_path)
+        else:
+            result['error'] = 'PDF生成失败'
+
+    def mark_blocked(self, item, block_state):
+        item['result']['status'] = 'blocked'
+        item['result']['error'] = f'被知乎拦截: {block_state}'
+        item['done'] = True
+
+    def finish_item(self, item):
+        """条目走完流水线后写入清单；释放文章数据以控制内存"""
+        result = item['result']
+        if item.get('error'):
+            result['error'] = item['error']
+        item.pop('article_data', None)
+        item.pop('page', None)
+        result['elapsed'] = round(time.time() - item['start_time'], 2)
+        self.write_result(result)
+        job_id = item['job']['id']
+        status_icon = {'ok': '✅', 'unchanged': '⏭️'}.get(result['status'], '❌')
+        print(f"{status_icon} [{job_id}] {result['status']} ({result['elapsed']}s) {result['error'] or result['pdf_path']}")
+
+    def output_name(self, job, article_data):
+        """PDF文件名中带上任务ID，避免同一问题下多个回答重名"""
+        safe_title = clean_filename(article_data['title'])[:50] or 'zhihu_article'
+        return f"知乎文章_{safe_title}_{clean_filename(job['id'])}.pdf"
+
+    def write_result(self, result):
+        with self.manifest_lock:
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.scraper.print_http_stats()
+        self.scraper.close()
+        self.driver_pool.close()
+        if isinstance(self.pdf_generator, PDFRenderPool):
+            self.pdf_generator.close()
@@ -0,0 +1,64 @@
+import time
+import threading
+from contextlib import contextmanager
+from config import (ADAPTIVE_MIN_WORKERS, ADAPTIVE_INCREASE_AFTER, BLOCK_PAUSE_SECONDS,
+                    BLOCK_PAUSE_MAX)
+
+
+class AdaptiveConcurrency:
+    """AIMD并发控制：连续成功时并发数加一，遇到拦截时减半并暂停一段时间
+
+    连续多次拦截时暂停时间翻倍（不超过BLOCK_PAUSE_MAX），一次成功后恢复。
+    """
+
+    def __init__(self, maximum, initial=None, minimum=None, increase_after=None,
+                 pause_seconds=None, max_pause=None):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum or ADAPTIVE_MIN_WORKERS, self.maximum))
+        self.limit = min(self.maximum, initial or self.maximum)
+        self.increase_after = increase_after or ADAPTIVE_INCREASE_AFTER
+        self.pause_seconds = pause_seconds or BLOCK_PAUSE_SECONDS
+        self.max_pause = max_pause or BLOCK_PAUSE_MAX
+        self.condition = threading.Condition()
+        self.active = 0
+        self.successes = 0
+        self.consecutive_blocks = 0
+        self.paused_until = 0.0
+
+    @contextmanager
+    def slot(self):
+        """with controller.slot(): 占用一个并发名额，超过当前上限或暂停期间阻塞"""
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.time()
+                if wait <= 0 and self.active < self.limit:
+                    break
+                self.condition.wait(timeout=wait if wait > 0 else None)
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify_all()
+
+    def on_success(self):
+        """加性增：连续increase_after次成功后并发上限加一"""
+        with self.condition:
+            self.consecutive_blocks = 0
+            self.successes += 1
+            if self.successes >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self.successes = 0
+                print(f"📈 并发数提升到 {self.limit}")
+                self.condition.notify_all()
+
+    def on_block(self, state):
+        """乘性减：并发上限减半，并让所有工作线程暂停"""
+        with self.condition:
+            self.successes = 0
+            self.consecutive_blocks += 1
+            self.limit = max(self.minimum, self.limit // 2)
+            pause = min(self.max_pause, self.pause_seconds * (2 ** (self.consecutive_blocks - 1)))
+            self.paused_until = max(self.paused_until, time.time() + pause)
+            print(f"📉 遇到拦截({state})，并发数降为 {self.limit}，暂停 {pause:.0f}s")
@@ -11,10 +11,97 @@ IMAGES_DIR = os.path.join(DOWNLOAD_DIR, "images")
 TEMP_DIR = "temp"
 
 # 请求配置
-REQUEST_TIMEOUT = 30
-RETRY_TIMES = 3
-DELAY_BETWEEN_REQUESTS = 2
+REQUEST_TIMEOUT = 30     # 读取超时（秒）
+CONNECT_TIMEOUT = 5      # 连接超时（秒）
+RETRY_TIMES = 3          # 429/5xx/超时的最大重试次数
+DELAY_BETWEEN_REQUESTS = 2  # 重试退避的基础间隔（秒），每次重试翻倍并加随机抖动
+RETRY_MAX_DELAY = 30     # 单次退避最长等待（秒）
+HTTP_POOL_SIZE = 16      # 每个主机的连接池大小
+
+# 按主机限流：主机模式 -> (每秒请求数, 突发容量)，同一次运行的所有线程共用
+RATE_LIMITS = {
+    "www.zhihu.com": (1.0, 3),       # 页面和接口请求，保护cookie不被风控
+    "*.zhimg.com": (20.0, 40),       # 图片CDN
+}
+SCRAPER_ENGINE = "auto"  # 抓取引擎: http / browser / auto（先http，失败再用浏览器）
+QUESTION_PAGE_SIZE = 20  # 整个问题爬取时每页回答数
+HTML_PARSER = "lxml"     # BeautifulSoup解析器（lxml比html.parser快一个数量级）
+
+# 自适应并发配置（批量模式遇到403/验证码/登录墙时自动降速）
+ADAPTIVE_MIN_WORKERS = 1      # 并发数下限
+ADAPTIVE_INCREASE_AFTER = 10  # 连续成功多少次后并发数加一
+BLOCK_PAUSE_SECONDS = 60      # 遇到拦截后的暂停时间（秒），连续拦截时翻倍
+BLOCK_PAUSE_MAX = 900         # 最长暂停时间（秒）
+BLOCK_RETRY_TIMES = 2         # 被拦截的任务暂停后最多重试次数
+
+# 流水线配置（加载页面 → 解析 → 下载图片 → 生成PDF 各阶段同时处理不同文章）
+PIPELINE_QUEUE_SIZE = 4      # 阶段之间的队列容量，下游处理不过来时上游阻塞
+PIPELINE_PARSE_WORKERS = 1   # 解析线程数
+PIPELINE_IMAGE_WORKERS = 2   # 同时下载图片的文章数（每篇文章内部再用IMAGE_DOWNLOAD_WORKERS个线程）
+PIPELINE_RENDER_WORKERS = 1  # 生成PDF的线程数
+PDF_RENDER_PROCESSES = 0     # 大于0时用多进程生成PDF（建议设为CPU核数），此时生成PDF的线程数与进程数相同
+
+# 浏览器池配置
+DRIVER_POOL_SIZE = 2     # 同时保持的无头浏览器数量
+DRIVER_MAX_PAGES = 50    # 每个浏览器加载多少页面后重建
+
+# 浏览器资源拦截（图片由爬虫自己下载，浏览器里不需要加载图片、字体、音视频和统计脚本）
+BROWSER_BLOCK_RESOURCES = True
+BROWSER_BLOCKED_URL_PATTERNS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf",                 # 字体
+    "*.mp4", "*.m3u8", "*.ts", "*.webm", "*.mp3",          # 音视频
+    "*google-analytics.com*", "*googletagmanager.com*", "*hm.baidu.com*",
+    "*zhihu-web-analytics*", "*datahub.zhihu.com*", "*sentry*",          # 统计和监控
+]
+BROWSER_IMAGE_URL_PATTERNS = ["*.zhimg.com/v2-*", "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp"]
+# True时浏览器照常加载图片，并从DevTools网络日志中直接取出图片字节，未取到的再用requests下载
+# （适用于图片URL带签名、必须使用浏览器referer/cookies的情况）
+BROWSER_CAPTURE_IMAGES = False
+
+# 页面就绪检测配置
+PAGE_READY_TIMEOUT = 15  # 单个页面最长等待时间（秒）
+NETWORK_IDLE_MS = 500    # 资源请求数保持不变多久视为网络空闲（毫秒）
+SCROLL_MAX_STEPS = 20    # 为加载懒加载图片最多滚动的次数
 
 # 图片配置
 MAX_IMAGE_SIZE = 2048  # 最大图片尺寸
-IMAGE_QUALITY = 85     # 图片质量 
\ No newline at end of file
+IMAGE_QUALITY = 85     # 图片质量
+IMAGE_DOWNLOAD_WORKERS = 8  # 并发下载图片的线程数
+IMAGE_TARGET_DPI = 150      # 图片目标分辨率：按PDF中的显示尺寸选择下载的图片版本，嵌入PDF前也缩小到该分辨率
+IMAGE_ORIGINAL_QUALITY = False  # True时总是下载原图（_r），不按分辨率选择
+
+# 图片下载上限（流式下载，超出后按策略处理，限制每个下载线程的内存峰值）
+IMAGE_MAX_BYTES = 8 * 1024 * 1024   # 单张图片最多下载的字节数
+IMAGE_MAX_PIXELS = 40_000_000       # 单张图片最大像素数（避免解码时占用过多内存）
+IMAGE_PROBE_BYTES = 256 * 1024      # 探测格式和尺寸时最多读取的头部字节数
+IMAGE_OVERSIZE_POLICY = "downscale"  # 超限图片: downscale（改下更小的知乎图片版本，没有则放链接）/ link（放原图链接）
+IMAGE_ANIMATED_POLICY = "first_frame"  # 动图: first_frame（只保留第一帧）/ link（放原图链接）/ keep（按普通图片处理）
+
+# PDF中文字体候选（按顺序查找，第一个能加载的生效；都不可用时使用ReportLab内置的STSong-Light）
+PDF_FONT_CANDIDATES = [
+    ("SimSun", "C:/Windows/Fonts/simsun.ttc"),
+    ("MicrosoftYaHei", "C:/Windows/Fonts/msyh.ttc"),
+    ("WenQuanYiZenHei", "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc"),
+    ("WenQuanYiZenHei", "/usr/share/fonts/wenquanyi/wqy-zenhei/wqy-zenhei.ttc"),
+    ("WenQuanYiMicroHei", "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"),
+    ("NotoSansSC", "/usr/share/fonts/truetype/noto/NotoSansSC-Regular.ttf"),
+    # Noto CJK的OTF/TTC多为CFF轮廓，ReportLab无法加载时自动跳过
+    ("NotoSansCJK", "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"),
+    ("NotoSansCJK", "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc"),
+]
+
+# PDF中图片的最大显示尺寸（英寸）
+PDF_IMAGE_MAX_WIDTH = 4
+PDF_IMAGE_MAX_HEIGHT = 3
+PDF_PASSTHROUGH_TOLERANCE = 2.0  # 兼容的JPEG/PNG不超过目标DPI所需像素的该倍数时直接嵌入，不缩小（覆盖知乎720w版本）
+
+# 知乎图片URL的尺寸后缀及其宽度（像素），按宽度从小到大排列；_r为原图
+ZHIHU_IMAGE_VARIANTS = [("720w", 720), ("1440w", 1440)]
+
+# 增量导出配置
+ANSWER_STORE_PATH = os.path.join(DOWNLOAD_DIR, "answer_store.json")  # 回答元数据库
+
+# 图片缓存配置
+IMAGE_CACHE_ENABLED = True
+IMAGE_CACHE_DIR = os.path.join(DOWNLOAD_DIR, "image_cache")
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 缓存容量上限（字节）
@@ -0,0 +1,281 @@
+import re
+import html
+from urllib.parse import unquote
+from bs4 import NavigableString, Comment
+from utils import resolve_image_src, image_tag, image_placeholder
+
+# 知乎回答正文的中间表示：按原文顺序排列的块列表，由爬虫生成一次，PDF生成器直接使用
+#   {'type': 'paragraph', 'text': 行内标记, 'indent': 列表内续行的缩进层级（可选）}
+#   {'type': 'heading', 'level': 1-6, 'text': 行内标记}
+#   {'type': 'quote', 'text': 行内标记}
+#   {'type': 'list', 'ordered': bool, 'start': 起始序号, 'level': 嵌套层级, 'items': [行内标记, ...]}
+#   {'type': 'image', 'id': 图片表ID, 'caption': 图片说明}
+#   {'type': 'code', 'text': 原始代码文本}
+#   {'type': 'formula', 'tex': TeX公式}
+# 行内标记是ReportLab Paragraph支持的子集（<b> <i> <u> <strike> <super> <sub> <br/> <link> <font>），
+# 文本已转义，可以直接用于Paragraph。
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+INLINE_STYLE_TAGS = {
+    'b': 'b', 'strong': 'b', 'i': 'i', 'em': 'i', 'u': 'u',
+    's': 'strike', 'del': 'strike', 'sup': 'super', 'sub': 'sub',
+}
+PARAGRAPH_TAGS = {'p', 'div', 'section', 'figure', 'article'}
+SKIP_TAGS = {'script', 'style', 'svg', 'button', 'template', 'hr'}
+
+
+class BlockParser:
+    """遍历知乎正文的节点树，生成块列表和待下载的img元素列表
+
+    图片块先记录待下载列表中的下标（index），下载完成后由resolve_image_blocks换成图片表ID。
+    段落、标题、引用中的图片会把文本拆成前后两块，图片保持在原文位置。
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.images = []
+        self.inline = []    # 当前块累积的行内标记
+        self.list_count = 0
+
+    def parse(self, content_elem):
+        self.walk_children(content_elem, {'type': 'paragraph'})
+        self.flush({'type': 'paragraph'})
+        return merge_list_items(self.blocks), self.images
+
+    def walk_children(self, node, ctx):
+        for child in node.children:
+            self.walk(child, ctx)
+
+    def walk(self, node, ctx):
+        if isinstance(node, Comment):
+            return
+        if isinstance(node, NavigableString):
+            text = re.sub(r'\s+', ' ', str(node))
+            if text.strip() or self.inline:
+                self.inline.append(html.escape(text, quote=False))
+            return
+
+        name = node.name
+        if name in SKIP_TAGS:
+            return
+        if name == 'noscript':
+            # 知乎在noscript里放了同一张图片的副本，外面已有img时跳过，避免重复
+            if node.parent and any(img.find_parent('noscript') is None for img in node.parent.find_all('img')):
+                return
+            self.walk_children(node, ctx)
+        elif name == 'img':
+            self.add_image(node, ctx)
+        elif name == 'br':
+            self.inline.append('<br/>')
+        elif name in HEADING_TAGS:
+            self.flush(ctx)
+            heading = {'type': 'heading', 'level': HEADING_TAGS[name]}
+            self.walk_children(node, heading)
+            self.flush(heading)
+        elif name == 'blockquote':
+            self.flush(ctx)
+            quote = {'type': 'quote'}
+            self.walk_children(node, quote)
+            self.flush(quote)
+        elif name in ('ul', 'ol'):
+            self.flush(ctx)
+            self.list_count += 1
+            list_id = self.list_count  # 嵌套列表会继续增加计数，外层列表项要用自己的ID
+            level = ctx.get('level', -1) + 1 if ctx['type'] == 'list_item' else 0
+            number = 0
+            for li in node.find_all('li', recursive=False):
+                number += 1
+                item = {'type': 'list_item', 'list': list_id, 'ordered': name == 'ol',
+                        'number': number, 'level': level, 'continued': False}
+                self.walk_children(li, item)
+                self.flush(item)
+        elif name == 'pre':
+            self.flush(ctx)
+            code = node.get_text()
+            if code.strip():
+                self.blocks.append({'type': 'code', 'text': code.rstrip()})
+        elif name == 'figcaption':
+            caption = self.inline_markup(node)
+            if self.blocks and self.blocks[-1]['type'] == 'image' and not self.blocks[-1].get('caption'):
+                self.blocks[-1]['caption'] = node.get_text(strip=True)
+            elif caption:
+                self.flush(ctx)
+                self.blocks.append({'type': 'paragraph', 'text': caption})
+        elif name in PARAGRAPH_TAGS and ctx['type'] == 'list_item':
+            # 同一列表项中的多个段落合并为一项，用换行分隔
+            if self.inline:
+                self.inline.append('<br/>')
+            self.walk_children(node, ctx)
+        elif name in PARAGRAPH_TAGS:
+            # 引用中的段落仍属于引用
+            self.flush(ctx)
+            self.walk_children(node, ctx)
+            self.flush(ctx)
+        elif name in INLINE_STYLE_TAGS:
+            self.wrap_inline(node, ctx, f'<{INLINE_STYLE_TAGS[name]}>', f'</{INLINE_STYLE_TAGS[name]}>')
+        elif name == 'a':
+            href = node.get('href', '')
+            if href.startswith('http'):
+                self.wrap_inline(node, ctx, f'<link href="{html.escape(href)}" color="#175199">', '</link>')
+            else:
+                self.walk_children(node, ctx)
+        elif name == 'code':
+            self.wrap_inline(node, ctx, '<font backColor="#f2f2f2">', '</font>')
+        else:
+            self.walk_children(node, ctx)
+
+    def wrap_inline(self, node, ctx, open_tag, close_tag):
+        """给行内元素的内容加上标记；内容中有图片导致块被拆开时，只包住同一块里的部分"""
+        self.inline.append(open_tag)
+        start = len(self.blocks)
+        self.walk_children(node, ctx)
+        if len(self.blocks) != start:
+            # 块已被图片拆开，前半部分的标签在flush时已闭合，这里不再补标签
+            self.inline.insert(0, open_tag)
+        self.inline.append(close_tag)
+
+    def add_image(self, node, ctx):
+        if node.get('eeimg'):
+            self.add_formula(node, ctx)
+            return
+        # 懒加载图片的src是占位图，从data-*属性中解析真实URL
+        if not resolve_image_src(node):
+            return  # 忽略无效图片
+        self.flush(ctx)
+        self.blocks.append({'type': 'image', 'index': len(self.images), 'caption': node.get('alt', '')})
+        self.images.append(node)
+
+    def add_formula(self, node, ctx):
+        """知乎公式是带eeimg属性的图片，alt或src中的tex参数是TeX源码"""
+        tex = node.get('alt') or ''
+        if not tex:
+            match = re.search(r'[?&]tex=([^&]+)', node.get('src', ''))
+            tex = unquote(match.group(1).replace('+', ' ')) if match else ''
+        if not tex:
+            return
+        parent = node.parent
+        standalone = node.get('eeimg') == '2' or (
+            parent is not None and parent.name == 'p' and not parent.get_text(strip=True)
+            and len(parent.find_all('img')) == 1)
+        if standalone:
+            self.flush(ctx)
+            self.blocks.append({'type': 'formula', 'tex': tex})
+        else:
+            self.inline.append(f'<i>{html.escape(tex, quote=False)}</i>')
+
+    def inline_markup(self, node):
+        """取出节点的行内标记（不影响当前块）"""
+        saved, self.inline = self.inline, []
+        self.walk_children(node, {'type': 'paragraph'})
+        markup, self.inline = ''.join(self.inline).strip(), saved
+        return markup
+
+    def flush(self, ctx):
+        """把累积的行内标记输出为一个块"""
+        markup = balance_tags(''.join(self.inline))
+        self.inline = []
+        markup = re.sub(r'^(\s|<br/>)+|(\s|<br/>)+$', '', markup)
+        if not re.sub(r'<[^>]+>', '', markup).strip():
+            return
+        block = {key: value for key, value in ctx.items()}
+        block['text'] = markup
+        self.blocks.append(block)
+        if ctx['type'] == 'list_item':
+            # 同一列表项被嵌套列表或图片隔开后，后面的文字是该项的续行，不是新的列表项
+            ctx['continued'] = True
+
+
+def balance_tags(markup):
+    """补上被拆块截断的行内标签：去掉多余的闭合标签，给未闭合的标签补上闭合"""
+    stack = []
+    output = []
+    for token in re.split(r'(<[^>]+>)', markup):
+        match = re.match(r'<(/?)(\w+)[^>]*?(/?)>$', token)
+        if not match or match.group(3):
+            output.append(token)
+            continue
+        closing, tag = match.group(1), match.group(2)
+        if not closing:
+            stack.append(tag)
+            output.append(token)
+        elif tag in stack:
+            while stack:
+                open_tag = stack.pop()
+                output.append(f'</{open_tag}>')
+                if open_tag == tag:
+                    break
+    output.extend(f'</{tag}>' for tag in reversed(stack))
+    return ''.join(output)
+
+
+def merge_list_items(blocks):
+    """把同一个列表的连续列表项合并为list块；被图片隔开的列表项拆成两个列表，序号接续
+
+    列表项的续行（嵌套列表或图片之后的文字）紧跟在该项后面时并入该项，
+    否则输出为不带序号、与列表文字对齐的缩进段落。
+    """
+    merged = []
+    for block in blocks:
+        if block['type'] != 'list_item':
+            merged.append(block)
+            continue
+        last = merged[-1] if merged else None
+        same_list = last and last['type'] == 'list' and last['list'] == block['list']
+        if block['continued']:
+            if same_list:
+                last['items'][-1] += '<br/>' + block['text']
+            else:
+                merged.append({'type': 'paragraph', 'text': block['text'], 'indent': block['level'] + 1})
+        elif same_list:
+            last['items'].append(block['text'])
+        else:
+            merged.append({'type': 'list', 'list': block['list'], 'ordered': block['ordered'],
+                           'start': block['number'], 'level': block['level'], 'items': [block['text']]})
+    for block in merged:
+        block.pop('list', None)
+    return merged
+
+
+def html_to_blocks(content_elem):
+    """把知乎正文节点转换为块列表，返回 (块列表, 待下载的img元素列表)"""
+    return BlockParser().parse(content_elem)
+
+
+def resolve_image_blocks(blocks, image_results):
+    """把图片块的下标换成图片表ID，下载失败的图片块直接删除"""
+    resolved = []
+    for block in blocks:
+        if block['type'] == 'image':
+            img_data = image_results[block.pop('index')]
+            if not img_data:
+                continue
+            block['id'] = img_data['id']
+        resolved.append(block)
+    return resolved
+
+
+def blocks_to_html(blocks):
+    """把块列表还原为简化的HTML，作为article_data['content']供JSON导出、哈希比较和旧版流程使用"""
+    parts = []
+    for block in blocks:
+        kind = block['type']
+        if kind == 'paragraph':
+            parts.append(f"<p>{block['text']}</p>")
+        elif kind == 'heading':
+            parts.append(f"<h{block['level']}>{block['text']}</h{block['level']}>")
+        elif kind == 'quote':
+            parts.append(f"<blockquote>{block['text']}</blockquote>")
+        elif kind == 'list':
+            tag = 'ol' if block['ordered'] else 'ul'
+            items = ''.join(f"<li>{item}</li>" for item in block['items'])
+            parts.append(f"<{tag}>{items}</{tag}>")
+        elif kind == 'image' and 'id' in block:
+            parts.append(image_tag({'id': block['id'], 'alt': block.get('caption', '')}))
+        elif kind == 'image':
+            # 图片尚未下载时输出占位符
+            parts.append(image_placeholder(block['index']))
+        elif kind == 'code':
+            parts.append(f"<pre>{html.escape(block['text'], quote=False)}</pre>")
+        elif kind == 'formula':
+            parts.append(f"<p>{html.escape(block['tex'], quote=False)}</p>")
+    return ''.join(parts)
@@ -0,0 +1,191 @@
+import time
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+from config import (USER_AGENT, DRIVER_POOL_SIZE, DRIVER_MAX_PAGES, BROWSER_BLOCK_RESOURCES,
+                    BROWSER_BLOCKED_URL_PATTERNS, BROWSER_IMAGE_URL_PATTERNS, BROWSER_CAPTURE_IMAGES)
+
+
+def create_driver(cookies=None, block_resources=None, capture_images=None):
+    """启动一个无头Chrome并注入知乎cookies
+
+    block_resources为True（默认取BROWSER_BLOCK_RESOURCES）时不加载图片、字体、音视频和统计脚本。
+    capture_images为True（默认取BROWSER_CAPTURE_IMAGES）时照常加载图片并开启性能日志，
+    供爬虫从网络日志中取出图片字节。
+    """
+    if block_resources is None:
+        block_resources = BROWSER_BLOCK_RESOURCES
+    if capture_images is None:
+        capture_images = BROWSER_CAPTURE_IMAGES
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')  # 无头模式
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-web-security')
+    chrome_options.add_argument('--disable-features=VizDisplayCompositor')
+    chrome_options.add_argument('--log-level=3')  # 只显示致命错误
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+    if capture_images:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    if block_resources:
+        # 禁止自动播放媒体；需要从浏览器取图片时不禁止加载图片
+        chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+        if not capture_images:
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+            })
+    
+    driver = webdriver.Chrome(options=chrome_options)
+    if block_resources:
+        patterns = BROWSER_BLOCKED_URL_PATTERNS
+        if not capture_images:
+            patterns = patterns + BROWSER_IMAGE_URL_PATTERNS
+        block_resource_urls(driver, patterns)
+    elif capture_images:
+        driver.execute_cdp_cmd('Network.enable', {})
+    
+    # 添加cookies到driver
+    driver.get("https://www.zhihu.com")
+    for name, value in (cookies or {}).items():
+        # 设置cookie时指定domain和path，确保cookie正确设置
+        cookie_dict = {
+            'name': name, 
+            'value': value,
+            'domain': '.zhihu.com',  # 知乎的cookie domain
+            'path': '/'
+        }
+        try:
+            driver.add_cookie(cookie_dict)
+            print(f"✅ Cookie设置成功: {name}")
+        except Exception as e:
+            print(f"⚠️ Cookie设置失败 {name}: {e}")
+    
+    return driver
+
+
+def block_resource_urls(driver, patterns=None):
+    """通过DevTools协议拦截匹配的请求（字体、音视频、统计脚本等）"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns or BROWSER_BLOCKED_URL_PATTERNS + BROWSER_IMAGE_URL_PATTERNS})
+    except Exception as e:
+        print(f"⚠️ 设置资源拦截失败: {e}")
+
+
+class DriverPool:
+    """可复用的WebDriver池，多个文章共享预热好的浏览器实例
+
+    每个driver加载超过max_pages个页面或出错后会被关闭并在下次借出时重建。
+    借出、归还和回收都在同一个Condition下进行，等待中的线程在有空闲driver
+    或名额被释放时都会被唤醒，不会因为driver被回收而一直等待。
+    """
+
+    def __init__(self, cookies=None, size=None, max_pages=None, block_resources=None, capture_images=None):
+        self.cookies = cookies or {}
+        self.block_resources = block_resources
+        self.capture_images = capture_images
+        self.size = size or DRIVER_POOL_SIZE
+        self.max_pages = max_pages or DRIVER_MAX_PAGES
+        self.idle = []  # 空闲driver栈，后进先出，优先复用刚归还的实例
+        self.page_counts = {}  # id(driver) -> 已加载页面数
+        self.created = 0
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def warm_up(self):
+        """预先启动所有driver，避免第一批文章等待Chrome启动"""
+        drivers = []
+        try:
+            for _ in range(self.size):
+                drivers.append(self.checkout())
+        except Exception as e:
+            print(f"⚠️ 预热浏览器失败: {e}")
+        for driver in drivers:
+            self.checkin(driver)
+
+    def checkout(self, timeout=None):
+        """借出一个driver：有空闲的直接借出，名额未满时新建，否则等待归还或回收"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("DriverPool已关闭")
+                if self.idle:
+                    return self.idle.pop()
+                if self.created < self.size:
+                    self.created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("等待浏览器实例超时")
+                self.condition.wait(remaining)
+        
+        try:
+            print(f"🚀 启动浏览器实例 ({self.created}/{self.size})")
+            driver = create_driver(self.cookies, self.block_resources, self.capture_images)
+        except Exception:
+            self.release_slot()
+            raise
+        self.page_counts[id(driver)] = 0
+        return driver
+
+    def checkin(self, driver, broken=False):
+        """归还driver；出错或达到页面上限时回收该实例"""
+        count = self.page_counts.get(id(driver), 0)
+        if broken or self.closed or count >= self.max_pages:
+            reason = "出错" if broken else f"已加载{count}个页面"
+            print(f"♻️ 回收浏览器实例（{reason}）")
+            self.discard(driver)
+            return
+        with self.condition:
+            self.idle.append(driver)
+            self.condition.notify()
+
+    def discard(self, driver):
+        """关闭driver并释放名额"""
+        self.page_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠️ 关闭浏览器失败: {e}")
+        self.release_slot()
+
+    def release_slot(self):
+        """释放一个名额，唤醒等待的线程去新建driver"""
+        with self.condition:
+            self.created -= 1
+            self.condition.notify()
+
+    def record_page(self, driver):
+        """记录driver加载了一个页面"""
+        self.page_counts[id(driver)] = self.page_counts.get(id(driver), 0) + 1
+
+    @contextmanager
+    def driver(self):
+        """with pool.driver() as driver: 借出并在结束后自动归还"""
+        driver = self.checkout()
+        broken = False
+        try:
+            yield driver
+        except TimeoutException:
+            raise  # 页面加载超时不代表浏览器崩溃，继续复用
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.checkin(driver, broken=broken)
+
+    def close(self):
+        """关闭池中所有空闲的driver"""
+        with self.condition:
+            self.closed = True
+            drivers, self.idle = self.idle, []
+            self.condition.notify_all()
+        for driver in drivers:
+            self.discard(driver)
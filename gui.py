@@ -10,6 +10,9 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon
 from scraper import ZhihuScraper
 from pdf_generator import PDFGenerator
+from driver_pool import DriverPool
+from pipeline import Pipeline
+from config import PIPELINE_PARSE_WORKERS, PIPELINE_IMAGE_WORKERS, PIPELINE_RENDER_WORKERS
 from utils import load_cookies_from_json, create_directories
 
 CONFIG_FILE = 'gui_config.json'
@@ -59,14 +62,16 @@ def add_recent_record(title, pdf_path, timestamp):
 
 class DownloadThread(QThread):
     progress = pyqtSignal(str)
-    finished = pyqtSignal(str, str, str)  # pdf_path, title, timestamp
+    saved = pyqtSignal(str, str, str)  # pdf_path, title, timestamp（每篇文章完成时）
+    finished = pyqtSignal(int, int)    # 成功数, 总数
     error = pyqtSignal(str)
 
-    def __init__(self, url, cookie_path, save_dir, parent=None):
+    def __init__(self, urls, cookie_path, save_dir, driver_pool=None, parent=None):
         super().__init__(parent)
-        self.url = url
+        self.urls = urls
         self.cookie_path = cookie_path
         self.save_dir = save_dir
+        self.driver_pool = driver_pool
 
     def run(self):
         try:
@@ -74,38 +79,63 @@ class DownloadThread(QThread):
             create_directories()
             cookies = load_cookies_from_json(self.cookie_path)
             self.progress.emit("正在登录知乎...")
-            scraper = ZhihuScraper(cookies)
-            self.progress.emit("正在爬取文章...")
-            article_data = scraper.extract_article_content(self.url)
-            if not article_data:
-                self.error.emit("文章内容提取失败！")
-                return
-            self.progress.emit("正在生成PDF...")
-            pdf_gen = PDFGenerator()
-            safe_title = article_data['title'][:30] if article_data['title'] else 'zhihu_article'
-            output_name = f"知乎文章_{safe_title}_{article_data['timestamp']}.pdf"
-            output_path = os.path.join(self.save_dir, output_name)
-            pdf_path = pdf_gen.generate_pdf(article_data, output_path)
-            scraper.close()
+            self.scraper = ZhihuScraper(cookies, driver_pool=self.driver_pool)
+            self.pdf_gen = PDFGenerator()
+            # 多篇文章时，下一篇的页面加载和图片下载与上一篇的PDF生成同时进行
+            pipeline = Pipeline([
+                ('页面', self.stage_fetch, 1),
+                ('解析', self.stage_parse, PIPELINE_PARSE_WORKERS),
+                ('图片', self.stage_images, PIPELINE_IMAGE_WORKERS),
+                ('PDF', self.stage_render, PIPELINE_RENDER_WORKERS),
+            ])
+            items = pipeline.run({'url': url} for url in self.urls)
+            self.scraper.close()
             # 清理临时文件
             self.progress.emit("正在清理临时文件...")
             self.cleanup_temp()
-            if pdf_path:
-                self.finished.emit(pdf_path, article_data['title'], article_data['timestamp'])
+            success = sum(1 for item in items if item.get('pdf_path'))
+            if success:
+                self.finished.emit(success, len(items))
+            elif len(items) == 1:
+                self.error.emit(items[0].get('error') or "PDF生成失败！")
             else:
-                self.error.emit("PDF生成失败！")
+                self.error.emit(f"{len(items)} 篇文章全部下载失败！")
         except Exception as e:
             self.error.emit(f"发生错误: {e}")
 
+    def stage_fetch(self, item):
+        self.progress.emit(f"正在爬取文章: {item['url']}")
+        item['page'] = self.scraper.fetch_page(item['url'])
+
+    def stage_parse(self, item):
+        page = item.pop('page')
+        item['article_data'] = self.scraper.parse_page(page)
+        if page['block_state']:
+            # 登录墙/验证码页面解析出的是空内容，不生成PDF
+            item['error'] = f"被知乎拦截（{page['block_state']}），请更新Cookie或稍后重试！"
+            item['done'] = True
+        elif not item['article_data']:
+            item['error'] = "文章内容提取失败！"
+            item['done'] = True
+
+    def stage_images(self, item):
+        self.progress.emit(f"正在下载图片: {item['article_data']['title']}")
+        self.scraper.fetch_article_images(item['article_data'])
+
+    def stage_render(self, item):
+        article_data = item.pop('article_data')
+        self.progress.emit(f"正在生成PDF: {article_data['title']}")
+        safe_title = article_data['title'][:30] if article_data['title'] else 'zhihu_article'
+        output_name = f"知乎文章_{safe_title}_{article_data['timestamp']}.pdf"
+        output_path = os.path.join(self.save_dir, output_name)
+        item['pdf_path'] = self.pdf_gen.generate_pdf(article_data, output_path)
+        if item['pdf_path']:
+            self.saved.emit(item['pdf_path'], article_data['title'], article_data['timestamp'])
+        else:
+            item['error'] = "PDF生成失败！"
+
     def cleanup_temp(self):
-        # 删除临时图片文件
-        for f in os.listdir('.'):
-            if f.startswith('temp_') and f.endswith('.jpg'):
-                try:
-                    os.remove(f)
-                except Exception:
-                    pass
-        # 删除所有article_data_*.json
+        # 图片在内存中处理，不再产生temp_*.jpg；删除所有article_data_*.json
         for f in os.listdir('.'):
             if f.startswith('article_data_') and f.endswith('.json'):
                 try:
@@ -124,6 +154,10 @@ class ZhihuPDFGUI(QWidget):
         self.config = load_config()
         self.init_ui()
         self.download_thread = None
+        self.last_pdf_path = None
+        # 多次下载之间复用同一个浏览器，cookie文件变化时重建
+        self.driver_pool = None
+        self.driver_pool_cookie = None
         self.load_recent_list()
 
     def init_ui(self):
@@ -132,7 +166,7 @@ class ZhihuPDFGUI(QWidget):
         url_layout = QHBoxLayout()
         url_label = QLabel('知乎文章链接:')
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText('https://www.zhihu.com/question/...')
+        self.url_input.setPlaceholderText('https://www.zhihu.com/question/...（多个链接用空格分隔）')
         url_layout.addWidget(url_label)
         url_layout.addWidget(self.url_input)
         # cookie选择
@@ -206,10 +240,11 @@ class ZhihuPDFGUI(QWidget):
             save_config(self.config)
 
     def start_download(self):
-        url = self.url_input.text().strip()
+        # 可以输入多个链接（用空格分隔），多篇文章按流水线并行处理
+        urls = self.url_input.text().split()
         cookie_path = self.cookie_input.text().strip()
         save_dir = self.save_input.text().strip()
-        if not url or not url.startswith('http'):
+        if not urls or not all(url.startswith('http') for url in urls):
             QMessageBox.warning(self, '输入错误', '请输入有效的知乎文章链接！')
             return
         if not cookie_path or not os.path.exists(cookie_path):
@@ -221,22 +256,45 @@ class ZhihuPDFGUI(QWidget):
         self.download_btn.setEnabled(False)
         self.progress_bar.show()
         self.status_label.setText('开始下载...')
-        self.download_thread = DownloadThread(url, cookie_path, save_dir)
+        self.download_thread = DownloadThread(urls, cookie_path, save_dir, self.get_driver_pool(cookie_path))
         self.download_thread.progress.connect(self.on_progress)
+        self.download_thread.saved.connect(self.on_saved)
         self.download_thread.finished.connect(self.on_finished)
         self.download_thread.error.connect(self.on_error)
         self.download_thread.start()
 
+    def get_driver_pool(self, cookie_path):
+        if self.driver_pool and self.driver_pool_cookie != cookie_path:
+            self.driver_pool.close()
+            self.driver_pool = None
+        if not self.driver_pool:
+            self.driver_pool = DriverPool(load_cookies_from_json(cookie_path), size=1)
+            self.driver_pool_cookie = cookie_path
+        return self.driver_pool
+
+    def closeEvent(self, event):
+        if self.driver_pool:
+            self.driver_pool.close()
+        super().closeEvent(event)
+
     def on_progress(self, msg):
         self.status_label.setText(msg)
 
-    def on_finished(self, pdf_path, title, timestamp):
-        self.progress_bar.hide()
-        self.download_btn.setEnabled(True)
-        self.status_label.setText(f'下载完成！PDF已保存: {pdf_path}')
+    def on_saved(self, pdf_path, title, timestamp):
+        self.last_pdf_path = pdf_path
+        self.status_label.setText(f'PDF已保存: {pdf_path}')
         add_recent_record(title, pdf_path, timestamp)
         self.load_recent_list()
-        QMessageBox.information(self, '下载完成', f'PDF已保存到：\n{pdf_path}')
+
+    def on_finished(self, success, total):
+        self.progress_bar.hide()
+        self.download_btn.setEnabled(True)
+        if total == 1:
+            self.status_label.setText(f'下载完成！PDF已保存: {self.last_pdf_path}')
+            QMessageBox.information(self, '下载完成', f'PDF已保存到：\n{self.last_pdf_path}')
+        else:
+            self.status_label.setText(f'下载完成！成功 {success}/{total} 篇')
+            QMessageBox.information(self, '下载完成', f'成功 {success}/{total} 篇，PDF已保存到：\n{self.save_input.text().strip()}')
 
     def on_error(self, msg):
         self.progress_bar.hide()
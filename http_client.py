@@ -0,0 +1,95 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import get_rate_limiter
+from config import (REQUEST_TIMEOUT, CONNECT_TIMEOUT, RETRY_TIMES, DELAY_BETWEEN_REQUESTS,
+                    RETRY_MAX_DELAY, HTTP_POOL_SIZE)
+
+# 需要重试的HTTP状态码：限流和服务端错误
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """爬虫共用的HTTP层：连接池、按主机限流、指数退避重试、分离的连接/读取超时和请求统计"""
+
+    def __init__(self, pool_size=None, retries=None, rate_limiter=None):
+        self.pool_size = pool_size or HTTP_POOL_SIZE
+        self.retries = RETRY_TIMES if retries is None else retries
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.timeout = (CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+        self.session = requests.Session()
+        # 每个主机最多保持pool_size个连接，满足并发下载图片的需要
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.attempt_count = 0
+        self.failure_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def get(self, url, **kwargs):
+        """带重试的GET请求，返回最后一次的响应；重试用尽仍是网络错误时抛出该异常"""
+        kwargs.setdefault('timeout', self.timeout)
+        start_time = time.time()
+        attempts = 0
+        status = None
+        
+        try:
+            while True:
+                attempts += 1
+                self.rate_limiter.acquire(url)
+                try:
+                    response = self.session.get(url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempts > self.retries:
+                        raise
+                    delay = self.backoff_delay(attempts - 1)
+                    print(f"⚠️ 请求失败({e.__class__.__name__})，{delay:.1f}s后第{attempts}次重试: {url}")
+                    time.sleep(delay)
+                    continue
+                
+                status = response.status_code
+                if status not in RETRY_STATUS_CODES or attempts > self.retries:
+                    return response
+                delay = self.backoff_delay(attempts - 1, response.headers.get('Retry-After'))
+                print(f"⚠️ HTTP {status}，{delay:.1f}s后第{attempts}次重试: {url}")
+                response.close()
+                time.sleep(delay)
+        finally:
+            self.record(time.time() - start_time, attempts, status is None or status >= 400)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """计算退避时间：优先遵循Retry-After，否则为带随机抖动的指数退避"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        delay = DELAY_BETWEEN_REQUESTS * (2 ** attempt)
+        return min(delay, RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+    def record(self, latency, attempts, failed):
+        with self.stats_lock:
+            self.request_count += 1
+            self.attempt_count += attempts
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if failed:
+                self.failure_count += 1
+
+    def stats(self):
+        """返回请求统计信息"""
+        with self.stats_lock:
+            return {
+                'requests': self.request_count,
+                'attempts': self.attempt_count,
+                'retries': self.attempt_count - self.request_count,
+                'failures': self.failure_count,
+                'avg_latency': self.total_latency / self.request_count if self.request_count else 0.0,
+                'max_latency': self.max_latency,
+            }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,125 @@
+import os
+import time
+import threading
+from utils import image_key
+from config import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES
+
+
+class ImageCache:
+    """基于内容寻址的本地图片缓存，超过容量上限时按LRU淘汰
+
+    每张图片保存为一个文件：第一行为content-type，其后为原始字节。
+    文件的修改时间即最近访问时间，因此LRU顺序在多次运行之间保持。
+    """
+
+    SUFFIX = '.img'
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or IMAGE_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else IMAGE_CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = {}  # key -> [size, last_access]
+        self.total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.load_index()
+
+    def load_index(self):
+        """扫描缓存目录，重建内存索引"""
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            key = name[:-len(self.SUFFIX)]
+            self.entries[key] = [stat.st_size, stat.st_mtime]
+            self.total_bytes += stat.st_size
+
+    def make_key(self, url):
+        """缓存键与图片表中的图片ID一致"""
+        return image_key(url)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def get(self, url):
+        """读取缓存，命中时返回 (bytes, content_type)，未命中返回None"""
+        key = self.make_key(url)
+        path = self.path_for(key)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            header, data = raw.split(b'\n', 1)
+            os.utime(path, None)  # 更新访问时间
+        except (OSError, ValueError):
+            with self.lock:
+                self.forget(key)
+                self.misses += 1
+            return None
+        with self.lock:
+            if key in self.entries:
+                self.entries[key][1] = time.time()
+            self.hits += 1
+        return data, header.decode('ascii', 'replace')
+
+    def put(self, url, data, content_type):
+        """写入缓存，必要时淘汰最久未使用的条目"""
+        key = self.make_key(url)
+        path = self.path_for(key)
+        payload = content_type.encode('ascii', 'replace') + b'\n' + data
+        if len(payload) > self.max_bytes:
+            return
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️ 写入图片缓存失败 {key}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self.lock:
+            self.forget(key)
+            self.entries[key] = [len(payload), os.path.getmtime(path)]
+            self.total_bytes += len(payload)
+            self.evict()
+
+    def forget(self, key):
+        """从索引中移除条目（调用方需持有锁）"""
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[0]
+
+    def evict(self):
+        """按最近访问时间淘汰，直到总大小不超过上限（调用方需持有锁）"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+            self.forget(key)
+            self.evictions += 1
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+            }
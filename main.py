@@ -1,8 +1,13 @@
 import argparse
 import json
-from scraper import ZhihuScraper
-from utils import create_directories, extract_question_answer_ids
+import multiprocessing
+import os
+import sys
+from scraper import ZhihuScraper, ENGINES
+from utils import create_directories, extract_question_answer_ids, extract_question_id, article_to_json
 from pdf_generator import PDFGenerator
+from config import DOWNLOAD_DIR
+from metadata_store import MetadataStore
 
 def load_cookies_from_json(cookie_file):
     """从JSON文件加载cookies"""
@@ -24,11 +29,127 @@ def load_cookies_from_json(cookie_file):
         print(f"❌ 加载cookies失败: {e}")
         return {}
 
+def add_scraper_arguments(parser):
+    """单篇和批量模式共用的爬虫参数"""
+    parser.add_argument('--cookies', '-c', help='cookies文件路径')
+    parser.add_argument('--image-workers', type=int, help='并发下载图片的线程数')
+    parser.add_argument('--no-image-cache', action='store_true', help='不使用本地图片缓存')
+    parser.add_argument('--image-dpi', type=int, help='图片目标DPI：按PDF显示尺寸选择下载的图片版本，并在嵌入PDF前缩小（默认150）')
+    parser.add_argument('--original-images', action='store_true', default=None,
+                        help='总是下载原图，不按分辨率选择较小的版本')
+    parser.add_argument('--capture-images', action='store_true', default=None,
+                        help='浏览器模式下直接从浏览器网络日志中取图片，不再重复下载（适用于带签名的图片URL）')
+    parser.add_argument('--engine', choices=ENGINES,
+                        help='抓取引擎: http(仅解析initialData) / browser(Selenium) / auto(默认，先http后浏览器)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式：回答自上次导出后未变化时跳过下载和PDF生成')
+
+def add_render_arguments(parser):
+    """批量和整个问题模式的PDF生成参数"""
+    parser.add_argument('--render-processes', '-p', type=int,
+                        help='用多少个进程并行生成PDF（建议设为CPU核数，0为在线程中生成）')
+
+def load_cookies_arg(args):
+    """根据命令行参数加载cookies"""
+    cookies = {}
+    if args.cookies:
+        cookies = load_cookies_from_json(args.cookies)
+        if not cookies:
+            print("⚠️  警告: 未能加载cookies，将以游客身份访问")
+    else:
+        print("⚠️  警告: 未提供cookies文件，将以游客身份访问")
+    return cookies
+
+def batch_main(argv):
+    """批量模式: python main.py batch urls.txt"""
+    from batch import BatchRunner, load_jobs
+    
+    parser = argparse.ArgumentParser(prog='main.py batch', description='批量爬取知乎回答并生成PDF')
+    parser.add_argument('job_file', help='任务文件：每行一个URL，或JSONL（每行一个含url字段的JSON对象）')
+    parser.add_argument('--output-dir', '-d', default=DOWNLOAD_DIR, help='PDF输出目录')
+    parser.add_argument('--concurrency', '-j', type=int, default=2, help='同时处理的文章数')
+    parser.add_argument('--manifest', help='结果清单路径（默认: 输出目录/batch_manifest.jsonl）')
+    add_render_arguments(parser)
+    parser.add_argument('--no-resume', action='store_true', help='不跳过清单中已成功的任务')
+    add_scraper_arguments(parser)
+    
+    args = parser.parse_args(argv)
+    
+    create_directories()
+    jobs = load_jobs(args.job_file)
+    if not jobs:
+        print("❌ 任务文件中没有有效的知乎URL")
+        return
+    
+    runner = BatchRunner(
+        load_cookies_arg(args),
+        output_dir=args.output_dir,
+        concurrency=args.concurrency,
+        manifest_path=args.manifest,
+        scraper_options={
+            'image_workers': args.image_workers,
+            'use_image_cache': not args.no_image_cache,
+            'engine': args.engine,
+            'image_dpi': args.image_dpi,
+            'original_images': args.original_images,
+            'capture_images': args.capture_images,
+        },
+        incremental=args.incremental,
+        render_processes=args.render_processes,
+    )
+    # 增量模式靠回答版本判断是否需要重新导出，不再按清单跳过
+    runner.run(jobs, resume=not args.no_resume and not args.incremental)
+
+def question_main(argv):
+    """整个问题模式: python main.py question https://www.zhihu.com/question/123456"""
+    from batch import BatchRunner
+    
+    parser = argparse.ArgumentParser(prog='main.py question', description='爬取知乎问题下的所有回答并逐个生成PDF')
+    parser.add_argument('url', help='知乎问题URL')
+    parser.add_argument('--output-dir', '-d', help='PDF输出目录（默认: downloads/question_<问题ID>）')
+    parser.add_argument('--concurrency', '-j', type=int, default=2, help='同时生成PDF的数量')
+    parser.add_argument('--limit', type=int, help='最多处理多少个回答')
+    add_render_arguments(parser)
+    parser.add_argument('--no-resume', action='store_true', help='不跳过清单中已成功的回答')
+    add_scraper_arguments(parser)
+    
+    args = parser.parse_args(argv)
+    
+    question_id = extract_question_id(args.url)
+    if not question_id:
+        print("❌ 无效的知乎问题URL格式")
+        return
+    
+    create_directories()
+    runner = BatchRunner(
+        load_cookies_arg(args),
+        output_dir=args.output_dir or os.path.join(DOWNLOAD_DIR, f"question_{question_id}"),
+        concurrency=args.concurrency,
+        scraper_options={
+            'image_workers': args.image_workers,
+            'use_image_cache': not args.no_image_cache,
+            'image_dpi': args.image_dpi,
+            'original_images': args.original_images,
+            'capture_images': args.capture_images,
+        },
+        incremental=args.incremental,
+        render_processes=args.render_processes,
+    )
+    runner.run_question(question_id, resume=not args.no_resume and not args.incremental, limit=args.limit)
+
 def main():
-    parser = argparse.ArgumentParser(description='知乎文章爬取PDF生成器')
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'question':
+        question_main(sys.argv[2:])
+        return
+    
+    parser = argparse.ArgumentParser(description='知乎文章爬取PDF生成器（批量模式: main.py batch <文件>，整个问题: main.py question <URL>）')
     parser.add_argument('url', help='知乎文章URL')
-    parser.add_argument('--cookies', '-c', help='cookies文件路径')
     parser.add_argument('--output', '-o', help='输出PDF文件路径')
+    parser.add_argument('--embed-images', action='store_true', help='导出的JSON中以base64内嵌图片（自包含文件）')
+    add_scraper_arguments(parser)
     
     args = parser.parse_args()
     
@@ -42,16 +163,14 @@ def main():
         return
     
     # 加载cookies
-    cookies = {}
-    if args.cookies:
-        cookies = load_cookies_from_json(args.cookies)
-        if not cookies:
-            print("⚠️  警告: 未能加载cookies，将以游客身份访问")
-    else:
-        print("⚠️  警告: 未提供cookies文件，将以游客身份访问")
+    cookies = load_cookies_arg(args)
     
     # 创建爬虫实例
-    scraper = ZhihuScraper(cookies)
+    metadata_store = MetadataStore() if args.incremental else None
+    scraper = ZhihuScraper(cookies, image_workers=args.image_workers,
+                           use_image_cache=not args.no_image_cache, engine=args.engine,
+                           metadata_store=metadata_store, image_dpi=args.image_dpi,
+                           original_images=args.original_images, capture_images=args.capture_images)
     
     try:
         print(f"🚀 开始爬取文章: {args.url}")
@@ -60,28 +179,38 @@ def main():
         # 提取文章内容
         article_data = scraper.extract_article_content(args.url)
         
-        if article_data:
+        if article_data and article_data.get('unchanged'):
+            print(f"⏭️ 回答未变化，无需重新生成PDF: {article_data['pdf_path']}")
+        elif article_data:
             print(f"✅ 文章标题: {article_data['title']}")
             print(f"✅ 作者: {article_data['author']}")
             print(f"✅ 图片数量: {len(article_data['images'])}")
             print(f"✅ 内容长度: {len(article_data['content'])} 字符")
+            if 'wait_time' in article_data:
+                print(f"✅ 页面等待耗时: {article_data['wait_time']}s")
+            if 'parse_time' in article_data:
+                print(f"✅ 页面解析耗时: {article_data['parse_time']}s")
             
             # 保存文章数据
             output_file = f"article_data_{article_data['timestamp']}.json"
             with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(article_data, f, ensure_ascii=False, indent=2)
+                json.dump(article_to_json(article_data, embed_images=args.embed_images), f, ensure_ascii=False, indent=2)
             
             print(f"✅ 文章数据已保存到: {output_file}")
             
             # 生成PDF
-            pdf_generator = PDFGenerator()
+            pdf_generator = PDFGenerator(image_dpi=args.image_dpi)
             pdf_path = pdf_generator.generate_pdf(article_data, args.output)
             
             if pdf_path:
                 print(f"✅ PDF生成完成: {pdf_path}")
+                if metadata_store:
+                    metadata_store.record(article_data, pdf_path)
             else:
                 print("❌ PDF生成失败")
             
+        elif scraper.last_block_state():
+            print(f"❌ 被知乎拦截: {scraper.last_block_state()}，请更新Cookie或稍后重试")
         else:
             print("❌ 提取文章内容失败")
     
@@ -89,7 +218,9 @@ def main():
         print(f"❌ 程序执行失败: {e}")
     
     finally:
+        scraper.print_http_stats()
         scraper.close()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包为exe后多进程渲染需要
     main() 
\ No newline at end of file
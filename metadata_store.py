@@ -0,0 +1,72 @@
+import os
+import json
+import time
+import threading
+from config import ANSWER_STORE_PATH
+from utils import to_epoch_seconds
+
+
+class MetadataStore:
+    """本地回答元数据库：记录每个回答上次导出时的更新时间、内容哈希和生成的PDF
+
+    用于增量导出：回答未变化且PDF仍在时，跳过图片下载和PDF生成。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or ANSWER_STORE_PATH
+        self.lock = threading.Lock()
+        self.records = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.records = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ 读取回答元数据失败，将重新记录: {e}")
+
+    def get(self, answer_id):
+        with self.lock:
+            return self.records.get(str(answer_id))
+
+    def is_unchanged(self, answer_id, updated_time=None, content_hash=None):
+        """回答自上次导出后没有变化且PDF文件仍存在时返回上次的记录，否则返回None
+
+        优先比较updated_time，拿不到时比较正文HTML的哈希。
+        """
+        record = self.get(answer_id)
+        if not record or not record.get('pdf_path') or not os.path.exists(record['pdf_path']):
+            return None
+        # 旧记录可能存的是页面上的ISO时间，统一换算为秒数再比较
+        updated_time = to_epoch_seconds(updated_time)
+        recorded_time = to_epoch_seconds(record.get('updated_time'))
+        if updated_time is not None and recorded_time is not None:
+            return record if updated_time == recorded_time else None
+        if content_hash and content_hash == record.get('content_hash'):
+            return record
+        return None
+
+    def record(self, article_data, pdf_path):
+        """PDF生成成功后记录回答的版本信息"""
+        answer_id = article_data.get('answer_id')
+        if not answer_id:
+            return
+        with self.lock:
+            self.records[str(answer_id)] = {
+                'url': article_data['url'],
+                'title': article_data['title'],
+                'author': article_data['author'],
+                'updated_time': article_data.get('updated_time'),
+                'content_hash': article_data.get('content_hash'),
+                'pdf_path': pdf_path,
+                'exported_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self.save()
+
+    def save(self):
+        """原子写入（调用方需持有锁）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
@@ -1,7 +1,14 @@
 import os
 import re
+import time
+import threading
+import html
+import base64
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Preformatted,
+                                ListFlowable, ListItem)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
@@ -11,74 +18,185 @@ from reportlab.lib.colors import black, gray, HexColor
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from PIL import Image as PILImage
 import io
+from utils import extract_image_id
+from config import (PDF_IMAGE_MAX_WIDTH, PDF_IMAGE_MAX_HEIGHT, IMAGE_TARGET_DPI, PDF_FONT_CANDIDATES,
+                    PDF_PASSTHROUGH_TOLERANCE)
+
+# 每个进程只查找、注册一次中文字体，样式表也只创建一次，所有PDFGenerator共享
+_font_lock = threading.Lock()
+_chinese_font = None
+_shared_styles = None
+
+def get_chinese_font():
+    """查找并注册中文字体，返回字体名；结果在进程内缓存"""
+    global _chinese_font
+    with _font_lock:
+        if _chinese_font:
+            return _chinese_font
+        start_time = time.time()
+        for name, path in PDF_FONT_CANDIDATES:
+            if not os.path.exists(path):
+                continue
+            try:
+                pdfmetrics.registerFont(TTFont(name, path))
+                _chinese_font = name
+                break
+            except Exception as e:
+                print(f"⚠️ 字体加载失败 {path}: {e}")
+        if not _chinese_font:
+            # 使用ReportLab内置的Unicode CID字体作为备选，无需字体文件
+            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+            _chinese_font = 'STSong-Light'
+        print(f"🔤 中文字体: {_chinese_font}（查找和注册耗时 {(time.time() - start_time) * 1000:.0f}ms）")
+        return _chinese_font
+
+def get_shared_styles():
+    """返回共享的PDF样式表，首次调用时创建"""
+    global _shared_styles
+    if _shared_styles is None:
+        chinese_font = get_chinese_font()
+        with _font_lock:
+            if _shared_styles is None:
+                _shared_styles = build_styles(chinese_font)
+    return _shared_styles
+
+def build_styles(chinese_font):
+    """创建PDF样式，支持中文"""
+    styles = getSampleStyleSheet()
+    
+    # 标题样式
+    styles.add(ParagraphStyle(
+        name='ZhihuTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=black,
+        fontName=chinese_font,
+        leading=22
+    ))
+    
+    # 作者样式
+    styles.add(ParagraphStyle(
+        name='ZhihuAuthor',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=10,
+        alignment=TA_CENTER,
+        textColor=gray,
+        fontName=chinese_font,
+        leading=14
+    ))
+    
+    # 正文样式
+    styles.add(ParagraphStyle(
+        name='ZhihuContent',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        alignment=TA_JUSTIFY,
+        textColor=black,
+        fontName=chinese_font,
+        leading=16,
+        firstLineIndent=22  # 首行缩进
+    ))
+    
+    # 图片说明样式
+    styles.add(ParagraphStyle(
+        name='ZhihuImageCaption',
+        parent=styles['Normal'],
+        fontSize=9,
+        spaceAfter=15,
+        alignment=TA_CENTER,
+        textColor=gray,
+        fontName=chinese_font,
+        leading=12
+    ))
+    
+    # 正文中的标题样式（h1/h2用大标题，h3及以下用小标题）
+    styles.add(ParagraphStyle(
+        name='ZhihuHeading',
+        parent=styles['Normal'],
+        fontSize=15,
+        spaceBefore=10,
+        spaceAfter=8,
+        textColor=black,
+        fontName=chinese_font,
+        leading=20
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='ZhihuSubheading',
+        parent=styles['Normal'],
+        fontSize=13,
+        spaceBefore=8,
+        spaceAfter=6,
+        textColor=black,
+        fontName=chinese_font,
+        leading=18
+    ))
+    
+    # 列表项样式（不缩进首行，缩进由列表控制）
+    styles.add(ParagraphStyle(
+        name='ZhihuListItem',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=4,
+        alignment=TA_LEFT,
+        textColor=black,
+        fontName=chinese_font,
+        leading=16
+    ))
+    
+    # 引用样式
+    styles.add(ParagraphStyle(
+        name='ZhihuQuote',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        leftIndent=20,
+        borderPadding=(0, 0, 0, 8),
+        textColor=HexColor('#646464'),
+        fontName=chinese_font,
+        leading=16
+    ))
+    
+    # 代码块样式（代码中常有中文注释，使用中文字体）
+    styles.add(ParagraphStyle(
+        name='ZhihuCode',
+        parent=styles['Code'],
+        fontSize=9,
+        spaceAfter=12,
+        leftIndent=10,
+        backColor=HexColor('#f6f6f6'),
+        borderPadding=6,
+        fontName=chinese_font,
+        leading=13
+    ))
+    
+    # 公式样式（显示TeX源码）
+    styles.add(ParagraphStyle(
+        name='ZhihuFormula',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        alignment=TA_CENTER,
+        textColor=black,
+        fontName=chinese_font,
+        leading=16
+    ))
+    
+    return styles
+
 
 class PDFGenerator:
-    def __init__(self):
+    def __init__(self, image_dpi=None):
+        self.image_dpi = image_dpi or IMAGE_TARGET_DPI  # 嵌入图片的目标分辨率
         self.styles = self.create_styles()
     
     def create_styles(self):
-        """创建PDF样式，支持中文"""
-        styles = getSampleStyleSheet()
-        
-        # 注册中文字体
-        try:
-            # 尝试使用系统中文字体
-            pdfmetrics.registerFont(TTFont('SimSun', 'C:/Windows/Fonts/simsun.ttc'))
-            chinese_font = 'SimSun'
-        except:
-            # 使用Unicode字体作为备选
-            chinese_font = 'STSong-Light'
-        
-        # 标题样式
-        styles.add(ParagraphStyle(
-            name='ZhihuTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=black,
-            fontName=chinese_font,
-            leading=22
-        ))
-        
-        # 作者样式
-        styles.add(ParagraphStyle(
-            name='ZhihuAuthor',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=10,
-            alignment=TA_CENTER,
-            textColor=gray,
-            fontName=chinese_font,
-            leading=14
-        ))
-        
-        # 正文样式
-        styles.add(ParagraphStyle(
-            name='ZhihuContent',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=12,
-            alignment=TA_JUSTIFY,
-            textColor=black,
-            fontName=chinese_font,
-            leading=16,
-            firstLineIndent=22  # 首行缩进
-        ))
-        
-        # 图片说明样式
-        styles.add(ParagraphStyle(
-            name='ZhihuImageCaption',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=15,
-            alignment=TA_CENTER,
-            textColor=gray,
-            fontName=chinese_font,
-            leading=12
-        ))
-        
-        return styles
+        """获取PDF样式（进程内共享，字体只注册一次）"""
+        return get_shared_styles()
     
     def clean_html_tags(self, text):
         """清理HTML标签，保留基本格式"""
@@ -114,6 +232,7 @@ class PDFGenerator:
         
         content_parts = []
         image_index = 0
+        images_by_id = {img['id']: img for img in images if img.get('id')}
         
         # 递归遍历所有节点，保持顺序
         def process_node(node):
@@ -127,7 +246,15 @@ class PDFGenerator:
                     return [('text', text)]
                 return []
             elif node.name == 'img':
-                # 处理图片节点 - 直接按顺序分配图片
+                # 处理图片节点 - 优先按图片ID查找图片表
+                image_id = node.get('data-image-id')
+                if image_id:
+                    img_data = images_by_id.get(image_id)
+                    if img_data:
+                        return [('image', img_data)]
+                    print(f"⚠️ 图片表中没有图片: {image_id}")
+                    return []
+                # 兼容旧数据 - 直接按顺序分配图片
                 if image_index < len(images):
                     img_data = images[image_index]
                     image_index += 1
@@ -217,104 +344,183 @@ class PDFGenerator:
     
     def extract_image_id(self, url):
         """从图片URL中提取唯一标识"""
-        pattern = r'v2-([a-f0-9]+)_'
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-        return None
+        return extract_image_id(url)
+    
+    def display_size(self, img_width, img_height):
+        """保持宽高比缩放到PDF中的最大显示框，返回显示尺寸（点）"""
+        max_width = PDF_IMAGE_MAX_WIDTH * inch
+        max_height = PDF_IMAGE_MAX_HEIGHT * inch
+        ratio = min(max_width / img_width, max_height / img_height)
+        return img_width * ratio, img_height * ratio
+    
+    def can_embed_directly(self, img):
+        """判断图片能否不转码直接嵌入PDF：RGB/灰度的基线JPEG，或没有透明通道的RGB/灰度PNG"""
+        if img.format == 'JPEG':
+            return img.mode in ('RGB', 'L') and not img.info.get('progressive') and not img.info.get('progression')
+        if img.format == 'PNG':
+            return img.mode in ('RGB', 'L') and 'transparency' not in img.info
+        return False
     
-    def convert_image_format(self, image_path):
-        """转换图片格式为PDF支持的格式"""
+    def process_image_for_pdf(self, img_data):
+        """把图片转换为PDF可嵌入的格式，全部在内存中完成
+
+        已兼容且不超过目标像素PDF_PASSTHROUGH_TOLERANCE倍的JPEG/PNG直接使用原始字节，避免重新编码的开销和画质损失；
+        其他图片（WebP/AVIF、透明、调色板、CMYK等）或超出容差的图片转码为JPEG，超过目标DPI所需像素的先缩小。
+        返回 (BytesIO, 宽, 高, 嵌入方式)，嵌入方式为 'passthrough'（JPEG原样写入PDF）、
+        'lossless'（PNG不经PIL转码，由ReportLab解码后无损压缩）或 'transcode'；
+        尺寸取自解码结果，无需再次打开图片；失败返回None。
+        """
         try:
-            # 打开图片
-            with PILImage.open(image_path) as img:
+            image_bytes = img_data.get('data')
+            if image_bytes is None and img_data.get('base64_data'):
+                # 旧版JSON导出为base64
+                image_bytes = base64.b64decode(img_data['base64_data'])
+            if image_bytes is None and img_data.get('local_path'):
+                # 兼容旧版本（本地文件）
+                with open(img_data['local_path'], 'rb') as f:
+                    image_bytes = f.read()
+            if not image_bytes:
+                print(f"❌ 图片数据为空: {img_data.get('filename')}")
+                return None
+            
+            # 使用PIL打开图片
+            with PILImage.open(io.BytesIO(image_bytes)) as img:
+                # 按显示尺寸和目标DPI计算需要的像素，大图缩小后再编码
+                display_width, display_height = self.display_size(*img.size)
+                target_size = (max(1, round(display_width / inch * self.image_dpi)),
+                               max(1, round(display_height / inch * self.image_dpi)))
+                # 知乎按宽度提供720w/1440w等版本，下载的版本通常略大于目标像素，
+                # 容差内的兼容格式直接嵌入，不缩小
+                if img.width <= target_size[0] * PDF_PASSTHROUGH_TOLERANCE and self.can_embed_directly(img):
+                    mode = 'passthrough' if img.format == 'JPEG' else 'lossless'
+                    return io.BytesIO(image_bytes), img.width, img.height, mode
+                # 反正要重新编码的图片一律缩小到目标像素
+                if img.width > target_size[0]:
+                    # JPEG可以在解码时直接按1/2、1/4、1/8缩小，省去大部分解码开销
+                    img.draft('RGB', target_size)
+                    img = img.resize(target_size, PILImage.LANCZOS)
+                
                 # 转换为RGB模式（如果是RGBA或其他模式）
                 if img.mode in ('RGBA', 'LA', 'P'):
                     # 创建白色背景
                     background = PILImage.new('RGB', img.size, (255, 255, 255))
                     if img.mode == 'P':
                         img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                    background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
                     img = background
                 elif img.mode != 'RGB':
                     img = img.convert('RGB')
                 
-                # 生成新的文件名
-                base_name = os.path.splitext(image_path)[0]
-                new_path = f"{base_name}_converted.jpg"
-                
-                # 保存为JPEG格式
-                img.save(new_path, 'JPEG', quality=85, optimize=True)
-                
-                print(f"✅ 图片格式转换成功: {new_path}")
-                return new_path
-                
+                # 编码为内存中的JPEG
+                buffer = io.BytesIO()
+                img.save(buffer, 'JPEG', quality=85, optimize=True)
+                buffer.seek(0)
+                return buffer, img.width, img.height, 'transcode'
+            
         except Exception as e:
-            print(f"❌ 图片格式转换失败: {e}")
+            print(f"❌ 处理图片失败: {e}")
             return None
-    
-    def process_image_for_pdf(self, img_data):
-        """处理图片，确保格式兼容PDF"""
+
+    def image_flowables(self, img_data, image_counts, caption=None):
+        """把图片表条目转换为flowable列表（图片和说明），caption为已转义的说明文字"""
+        if caption is None:
+            caption = img_data.get('alt', '')
+        if img_data.get('placeholder') == 'link':
+            # 过大或动图未嵌入，只放原图链接
+            url = html.escape(img_data.get('original_url', ''))
+            reason = html.escape(img_data.get('reason', '图片未嵌入'))
+            link = Paragraph(f'[{reason}] <link href="{url}">{url}</link>', self.styles['ZhihuImageCaption'])
+            return [link, Spacer(1, 10)]
         try:
-            # 处理base64图片数据
-            if 'base64_data' in img_data:
-                import base64
-                import io
-                from PIL import Image
-                
-                # 解码base64数据
-                image_bytes = base64.b64decode(img_data['base64_data'])
-                
-                # 使用PIL打开图片
-                with Image.open(io.BytesIO(image_bytes)) as img:
-                    # 转换为RGB模式（如果是RGBA或其他模式）
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        # 创建白色背景
-                        background = Image.new('RGB', img.size, (255, 255, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                        img = background
-                    elif img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    
-                    # 保存为临时JPEG文件
-                    temp_path = f"temp_{img_data['filename']}.jpg"
-                    img.save(temp_path, 'JPEG', quality=85, optimize=True)
-                    
-                    print(f"✅ 图片格式转换成功: {temp_path}")
-                    return temp_path
-            
-            # 兼容旧版本（本地文件）
-            original_path = img_data.get('local_path')
-            if original_path and os.path.exists(original_path):
-                # 检查文件大小
-                file_size = os.path.getsize(original_path)
-                if file_size == 0:
-                    print(f"❌ 图片文件为空: {original_path}")
-                    return None
-                
-                # 获取文件扩展名
-                file_ext = os.path.splitext(original_path)[1].lower()
-                
-                # 如果是WebP格式，需要转换
-                if file_ext in ['.webp', '.avif']:
-                    print(f"🔄 转换WebP图片: {original_path}")
-                    converted_path = self.convert_image_format(original_path)
-                    if converted_path:
-                        return converted_path
-                    else:
-                        return None
-                
-                # 其他格式直接使用
-                return original_path
+            # 处理图片格式（内存中完成，尺寸来自解码结果）
+            processed = self.process_image_for_pdf(img_data)
+            if not processed:
+                print(f"❌ 图片处理失败: {img_data['filename']}")
+                return []
+            image_buffer, img_width, img_height, embed_mode = processed
+            image_counts[embed_mode] += 1
+            # 计算合适的显示尺寸（保持宽高比）
+            display_width, display_height = self.display_size(img_width, img_height)
+            flowables = [Image(image_buffer, width=display_width, height=display_height), Spacer(1, 10)]
             
-            return None
+            # 添加图片说明（如果有）
+            if caption:
+                flowables.append(Paragraph(caption, self.styles['ZhihuImageCaption']))
+                flowables.append(Spacer(1, 10))
             
+            print(f"✅ 成功添加图片: {img_data['filename']} ({display_width:.1f}x{display_height:.1f})")
+            return flowables
         except Exception as e:
             print(f"❌ 处理图片失败: {e}")
-            return None
-
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    def render_blocks(self, blocks, images, image_counts):
+        """把爬虫生成的块列表直接转换为flowable列表，图片按ID从图片表取，无需再解析HTML"""
+        images_by_id = {img['id']: img for img in images}
+        flowables = []
+        for block in blocks:
+            kind = block['type']
+            try:
+                if kind == 'paragraph' and block.get('indent'):
+                    # 列表项的续行：不带序号，与列表文字对齐
+                    style = ParagraphStyle(name='ZhihuListContinuation', parent=self.styles['ZhihuListItem'],
+                                           leftIndent=18 * block['indent'])
+                    flowables.append(Paragraph(block['text'], style))
+                elif kind == 'paragraph':
+                    flowables.append(Paragraph(block['text'], self.styles['ZhihuContent']))
+                    flowables.append(Spacer(1, 6))
+                elif kind == 'heading':
+                    style = 'ZhihuHeading' if block['level'] <= 2 else 'ZhihuSubheading'
+                    flowables.append(Paragraph(f"<b>{block['text']}</b>", self.styles[style]))
+                elif kind == 'quote':
+                    flowables.append(Paragraph(block['text'], self.styles['ZhihuQuote']))
+                elif kind == 'list':
+                    items = [ListItem(Paragraph(item, self.styles['ZhihuListItem'])) for item in block['items']]
+                    flowables.append(ListFlowable(
+                        items,
+                        bulletType='1' if block['ordered'] else 'bullet',
+                        start=block.get('start', 1) if block['ordered'] else '•',
+                        leftIndent=18 * (block.get('level', 0) + 1),
+                        bulletFontSize=9
+                    ))
+                    flowables.append(Spacer(1, 6))
+                elif kind == 'code':
+                    flowables.append(Preformatted(block['text'], self.styles['ZhihuCode'], maxLineLength=90))
+                elif kind == 'formula':
+                    flowables.append(Paragraph(html.escape(block['tex'], quote=False), self.styles['ZhihuFormula']))
+                elif kind == 'image':
+                    img_data = images_by_id.get(block['id'])
+                    if img_data:
+                        caption = html.escape(block.get('caption') or img_data.get('alt', ''), quote=False)
+                        flowables.extend(self.image_flowables(img_data, image_counts, caption))
+            except Exception as e:
+                print(f"❌ 处理{kind}块失败: {e}")
+        print(f"🔍 内容块: {len(blocks)} 个, 生成 {len(flowables)} 个排版元素")
+        return flowables
+    
+    def render_html_content(self, content, images, image_counts):
+        """旧版流程：解析内容HTML，按图文顺序生成flowable列表"""
+        content_parts = self.extract_images_from_content(content, images)
+        flowables = []
+        for i, (part_type, part_content) in enumerate(content_parts):
+            print(f"🔍 处理第{i+1}部分: {part_type}")
+            
+            if part_type == 'text':
+                # 分段处理
+                for para in part_content.split('\n'):
+                    if para.strip():
+                        try:
+                            flowables.append(Paragraph(para.strip(), self.styles['ZhihuContent']))
+                        except Exception as e:
+                            print(f"❌ 处理段落失败: {e}")
+                            flowables.append(Paragraph(para.strip(), self.styles['Normal']))
+                        flowables.append(Spacer(1, 6))
+            elif part_type == 'image':
+                flowables.extend(self.image_flowables(part_content, image_counts))
+        return flowables
+    
     def generate_pdf(self, article_data, output_path=None):
         """生成PDF文件"""
         try:
@@ -357,82 +563,68 @@ class PDFGenerator:
             story.append(meta)
             story.append(Spacer(1, 30))
             
-            # 处理内容
-            content_parts = self.extract_images_from_content(article_data['content'], article_data['images'])
-            
-            for i, (part_type, part_content) in enumerate(content_parts):
-                print(f"🔍 处理第{i+1}部分: {part_type}")
-                
-                if part_type == 'text':
-                    # 处理文本内容
-                    if part_content.strip():
-                        # 分段处理
-                        paragraphs = part_content.split('\n')
-                        for para in paragraphs:
-                            if para.strip():
-                                try:
-                                    p = Paragraph(para.strip(), self.styles['ZhihuContent'])
-                                    story.append(p)
-                                    story.append(Spacer(1, 6))
-                                except Exception as e:
-                                    print(f"❌ 处理段落失败: {e}")
-                                    p = Paragraph(para.strip(), self.styles['Normal'])
-                                    story.append(p)
-                                    story.append(Spacer(1, 6))
-                elif part_type == 'image':
-                    # 处理图片
-                    try:
-                        # 处理图片格式
-                        processed_path = self.process_image_for_pdf(part_content)
-                        
-                        if processed_path and os.path.exists(processed_path):
-                            # 检查文件大小
-                            file_size = os.path.getsize(processed_path)
-                            print(f"🔍 处理后的图片文件大小: {file_size} bytes")
-                            
-                            if file_size > 0:
-                                # 使用PIL获取图片尺寸
-                                with PILImage.open(processed_path) as pil_img:
-                                    img_width, img_height = pil_img.size
-                                
-                                # 计算合适的显示尺寸
-                                max_width = 4 * inch
-                                max_height = 3 * inch
-                                
-                                # 保持宽高比
-                                ratio = min(max_width / img_width, max_height / img_height)
-                                display_width = img_width * ratio
-                                display_height = img_height * ratio
-                                
-                                # 添加图片
-                                img = Image(processed_path, width=display_width, height=display_height)
-                                story.append(img)
-                                story.append(Spacer(1, 10))
-                                
-                                # 添加图片说明（如果有）
-                                if part_content.get('alt'):
-                                    caption = Paragraph(part_content['alt'], self.styles['ZhihuImageCaption'])
-                                    story.append(caption)
-                                    story.append(Spacer(1, 10))
-                                
-                                print(f"✅ 成功添加图片: {part_content['filename']} ({display_width:.1f}x{display_height:.1f})")
-                            else:
-                                print(f"⚠️ 处理后的图片文件为空: {processed_path}")
-                        else:
-                            print(f"❌ 图片处理失败: {part_content['filename']}")
-                    except Exception as e:
-                        print(f"❌ 处理图片失败: {e}")
-                        import traceback
-                        traceback.print_exc()
+            # 处理内容：优先使用爬虫生成的块列表，只有HTML的旧数据（如旧版JSON导出）再解析HTML
+            image_counts = {'passthrough': 0, 'lossless': 0, 'transcode': 0}
+            if article_data.get('blocks') is not None:
+                story.extend(self.render_blocks(article_data['blocks'], article_data['images'], image_counts))
+            else:
+                story.extend(self.render_html_content(article_data['content'], article_data['images'], image_counts))
             
             # 生成PDF
             doc.build(story)
             
             print(f"✅ PDF生成成功: {output_path}")
+            print(f"🖼️ 图片: JPEG直接嵌入 {image_counts['passthrough']} 张, PNG无损嵌入 {image_counts['lossless']} 张, "
+                  f"转码 {image_counts['transcode']} 张")
             return output_path
             
         except Exception as e:
             print(f"❌ PDF生成失败: {e}")
             import traceback
             traceback.print_exc()
-            return None 
\ No newline at end of file
+            return None
+
+
+# 渲染进程中预先初始化的PDF生成器（每个进程一个，避免每篇文章重复注册字体和创建样式）
+_worker_generator = None
+
+def init_render_worker(image_dpi=None):
+    """渲染进程的初始化函数"""
+    global _worker_generator
+    _worker_generator = PDFGenerator(image_dpi)
+
+def render_in_worker(article_data, output_path):
+    """在渲染进程中生成PDF"""
+    return _worker_generator.generate_pdf(article_data, output_path)
+
+
+class PDFRenderPool:
+    """多进程PDF生成：ReportLab排版和PIL转码受GIL限制，在线程中只能用一个核
+
+    接口与PDFGenerator.generate_pdf相同，调用方线程阻塞到结果返回，
+    因此同时渲染的文章数由调用线程数决定，一般与进程数相同。
+    article_data中的图片以原始字节传给子进程（pickle），不经过base64。
+    """
+
+    def __init__(self, processes=None, image_dpi=None):
+        self.processes = processes or os.cpu_count() or 1
+        # 用spawn启动渲染进程：fork会在第一次submit时复制正在运行的抓取线程持有的锁，子进程可能死锁；
+        # 打包后的exe本来也只能用spawn
+        self.executor = ProcessPoolExecutor(max_workers=self.processes, initializer=init_render_worker,
+                                            initargs=(image_dpi,), mp_context=multiprocessing.get_context('spawn'))
+        print(f"🖨️ 启动 {self.processes} 个PDF渲染进程")
+
+    def generate_pdf(self, article_data, output_path=None):
+        """把article_data交给渲染进程生成PDF，返回PDF路径，失败返回None"""
+        # 只发送生成PDF需要的字段
+        payload = {key: value for key, value in article_data.items()
+                   if key in ('title', 'author', 'timestamp', 'content', 'blocks', 'images', 'url')}
+        try:
+            return self.executor.submit(render_in_worker, payload, output_path).result()
+        except Exception as e:
+            print(f"❌ 渲染进程生成PDF失败: {e}")
+            return None
+
+    def close(self):
+        self.executor.shutdown()
+
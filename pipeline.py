@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+from config import PIPELINE_QUEUE_SIZE
+
+# 通知阶段线程退出的结束标记
+STOP = object()
+
+
+class Pipeline:
+    """分阶段流水线：每个阶段有独立的线程数，阶段之间用有界队列连接
+
+    下游处理不过来时上游的put会阻塞（背压），同时在内存中的条目数不超过
+    各队列容量与各阶段线程数之和。条目是dict，由各阶段的处理函数原地修改；
+    标记了done的条目（失败、被拦截、未变化）不再处理，直接传给下一阶段。
+    """
+
+    def __init__(self, stages, queue_size=None, on_done=None):
+        self.stages = stages  # [(阶段名称, 处理函数, 线程数)]
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.on_done = on_done  # 每个条目走完所有阶段后调用（在最后一个阶段的线程中）
+        self.results = []
+        self.lock = threading.Lock()
+        self.busy_time = {name: 0.0 for name, _, _ in stages}
+
+    def run(self, items):
+        """把items依次送入流水线（可以是生成器，按背压节奏拉取），返回按完成顺序排列的条目"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        stage_threads = []
+        for index, (name, func, workers) in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            threads = [threading.Thread(target=self.worker, args=(name, func, queues[index], outbox),
+                                        name=f"pipeline-{name}-{i}", daemon=True)
+                       for i in range(max(1, workers))]
+            for thread in threads:
+                thread.start()
+            stage_threads.append(threads)
+        
+        start_time = time.time()
+        try:
+            for item in items:
+                queues[0].put(item)  # 第一阶段处理不过来时阻塞
+        finally:
+            # 逐级关闭：上一阶段的线程全部退出后，下一阶段才不会再收到条目
+            for index, threads in enumerate(stage_threads):
+                for _ in threads:
+                    queues[index].put(STOP)
+                for thread in threads:
+                    thread.join()
+        
+        elapsed = time.time() - start_time
+        summary = ', '.join(f"{name} {busy:.1f}s" for name, busy in self.busy_time.items())
+        print(f"⏱️ 流水线总耗时 {elapsed:.1f}s，各阶段累计处理时间: {summary}")
+        return self.results
+
+    def worker(self, name, func, inbox, outbox):
+        while True:
+            item = inbox.get()
+            if item is STOP:
+                return
+            if not item.get('done'):
+                start_time = time.time()
+                try:
+                    func(item)
+                except Exception as e:
+                    print(f"❌ 流水线阶段[{name}]出错: {e}")
+                    item['error'] = str(e)
+                    item['done'] = True
+                with self.lock:
+                    self.busy_time[name] += time.time() - start_time
+            if outbox is not None:
+                outbox.put(item)  # 下一阶段处理不过来时阻塞
+            else:
+                self.finish(item)
+
+    def finish(self, item):
+        with self.lock:
+            self.results.append(item)
+        if self.on_done:
+            try:
+                self.on_done(item)
+            except Exception as e:
+                print(f"⚠️ 处理流水线结果失败: {e}")
@@ -0,0 +1,81 @@
+import time
+import threading
+from fnmatch import fnmatch
+from urllib.parse import urlparse
+from config import RATE_LIMITS
+
+
+class TokenBucket:
+    """令牌桶：每秒补充rate个令牌，最多积累capacity个
+
+    只在进程内共享：所有HTTP请求都由主进程的抓取和图片线程发出，渲染进程不发请求。
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.state = [self.capacity, time.monotonic()]  # [当前令牌数, 上次补充时间]
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，没有令牌时阻塞等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                tokens = min(self.capacity, self.state[0] + (now - self.state[1]) * self.rate)
+                self.state[1] = now
+                if tokens >= 1:
+                    self.state[0] = tokens - 1
+                    return waited
+                self.state[0] = tokens
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """按主机限流：每个主机模式（如 pic*.zhimg.com）对应一个令牌桶，匹配的主机共用预算"""
+
+    def __init__(self, limits=None):
+        self.buckets = [
+            (pattern, TokenBucket(rate, capacity))
+            for pattern, (rate, capacity) in (RATE_LIMITS if limits is None else limits).items()
+        ]
+        self.stats_lock = threading.Lock()
+        self.wait_time = {}  # pattern -> 累计等待秒数
+
+    def bucket_for(self, host):
+        for pattern, bucket in self.buckets:
+            if fnmatch(host, pattern):
+                return pattern, bucket
+        return None, None
+
+    def acquire(self, url):
+        """请求url前调用，超出该主机预算时阻塞；未配置限流的主机直接放行"""
+        pattern, bucket = self.bucket_for(urlparse(url).hostname or '')
+        if not bucket:
+            return 0.0
+        waited = bucket.acquire()
+        if waited:
+            with self.stats_lock:
+                self.wait_time[pattern] = self.wait_time.get(pattern, 0.0) + waited
+        return waited
+
+    def stats(self):
+        """返回各主机模式的累计限流等待时间"""
+        with self.stats_lock:
+            return dict(self.wait_time)
+
+
+_default_limiter = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """返回进程内共享的限流器，同一次运行的所有爬虫和线程共用同一份预算"""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
@@ -1,24 +1,101 @@
 import time
 import json
-import requests
-from selenium import webdriver
+import base64
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
-import os
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from utils import *
 from bs4 import NavigableString
+from PIL import Image, ImageFile
+from config import (ZHIHU_BASE_URL, IMAGE_DOWNLOAD_WORKERS, IMAGE_CACHE_ENABLED, SCRAPER_ENGINE,
+                    PAGE_READY_TIMEOUT, NETWORK_IDLE_MS, SCROLL_MAX_STEPS, QUESTION_PAGE_SIZE,
+                    HTML_PARSER, HTTP_POOL_SIZE, IMAGE_TARGET_DPI, IMAGE_ORIGINAL_QUALITY,
+                    IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS, IMAGE_PROBE_BYTES, IMAGE_OVERSIZE_POLICY,
+                    IMAGE_ANIMATED_POLICY, BROWSER_CAPTURE_IMAGES)
+from image_cache import ImageCache
+from http_client import HttpClient
+from driver_pool import create_driver
+from content_blocks import html_to_blocks, resolve_image_blocks, blocks_to_html
 
 # 添加USER_AGENT常量
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
+# 流式下载图片时每次读取的块大小（字节）
+IMAGE_CHUNK_SIZE = 16 * 1024
+
+# 抓取引擎：http 只解析页面内嵌的initialData，browser 使用Selenium，auto 先http后browser
+ENGINES = ('http', 'browser', 'auto')
+
+# 被知乎拦截时跳转到的页面URL特征 -> 拦截状态
+BLOCK_URL_MARKERS = {
+    '/account/unhuman': 'captcha',
+    '/signin': 'login_wall',
+    '/signup': 'login_wall',
+}
+
+# 页面内容中的拦截特征 -> 拦截状态
+BLOCK_PAGE_MARKERS = {
+    'unhuman': 'captcha',
+    '系统监测到您的网络环境存在异常': 'captcha',
+    'signFlowModal': 'login_wall',
+}
+
+# 问题回答列表接口需要返回的字段
+QUESTION_ANSWERS_INCLUDE = 'data[*].content,updated_time,created_time,voteup_count,question;data[*].author.name'
+
+# 返回回答区域内任何属性中都没有真实URL的图片（与utils.resolve_image_src的属性顺序一致）
+PENDING_IMAGES_SCRIPT = """
+const root = arguments[0];
+const attrs = ['data-original', 'data-actualsrc', 'data-src', 'src'];
+return Array.from(root.querySelectorAll('img')).filter(img => {
+    return !attrs.some(attr => /^(https?:)?\\/\\//.test(img.getAttribute(attr) || ''));
+});
+"""
+
+# 回答区域内需要下载的图片（不含公式图片）
+CONTENT_IMAGES_SCRIPT = """
+return Array.from(arguments[0].querySelectorAll('img:not([eeimg])'));
+"""
+
+# 图片已从真实URL加载完成（不是data:占位图）
+IMAGE_LOADED_SCRIPT = """
+const img = arguments[0];
+return img.complete && img.naturalWidth > 0 && /^https?:/.test(img.currentSrc || img.src);
+"""
+
+# 页面加载状态和已发起的资源请求数，用于判断网络空闲
+NETWORK_STATE_SCRIPT = """
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
 class ZhihuScraper:
-    def __init__(self, cookies=None):
+    def __init__(self, cookies=None, image_workers=None, use_image_cache=None, engine=None,
+                 driver_pool=None, metadata_store=None, image_dpi=None, original_images=None,
+                 capture_images=None):
         self.cookies = cookies or {}
-        self.session = requests.Session()
         self.driver = None
+        self.driver_pool = driver_pool
+        self.metadata_store = metadata_store  # 设置后启用增量模式，未变化的回答直接跳过
+        self.local = threading.local()  # 每个线程最近一次遇到的拦截状态
+        self.engine = engine or SCRAPER_ENGINE
+        if self.engine not in ENGINES:
+            raise ValueError(f"未知的抓取引擎: {self.engine}，可选: {', '.join(ENGINES)}")
+        self.image_workers = image_workers or IMAGE_DOWNLOAD_WORKERS
+        self.image_dpi = image_dpi or IMAGE_TARGET_DPI
+        self.original_images = IMAGE_ORIGINAL_QUALITY if original_images is None else original_images
+        # 浏览器模式下从DevTools网络日志中取图片（浏览器池需用同样的capture_images创建）
+        self.capture_images = BROWSER_CAPTURE_IMAGES if capture_images is None else capture_images
+        # 连接池至少要容纳所有并发下载图片的线程
+        self.http = HttpClient(pool_size=max(HTTP_POOL_SIZE, self.image_workers))
+        self.session = self.http.session
+        if use_image_cache is None:
+            use_image_cache = IMAGE_CACHE_ENABLED
+        self.image_cache = ImageCache() if use_image_cache else None
         self.setup_session()
     
     def setup_session(self):
@@ -27,7 +104,8 @@ class ZhihuScraper:
             'User-Agent': USER_AGENT,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
+            # 不声明br：requests只有安装了brotli才能解压，否则页面和接口返回无法解码的字节
+            'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
@@ -39,101 +117,506 @@ class ZhihuScraper:
     
     def init_driver(self):
         """初始化Selenium WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # 无头模式
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--log-level=3')  # 只显示致命错误
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        
-        # 添加cookies到driver
-        self.driver.get("https://www.zhihu.com")
-        for name, value in self.cookies.items():
-            # 设置cookie时指定domain和path，确保cookie正确设置
-            cookie_dict = {
-                'name': name, 
-                'value': value,
-                'domain': '.zhihu.com',  # 知乎的cookie domain
-                'path': '/'
-            }
-            try:
-                self.driver.add_cookie(cookie_dict)
-                print(f"✅ Cookie设置成功: {name}")
-            except Exception as e:
-                print(f"⚠️ Cookie设置失败 {name}: {e}")
+        self.driver = create_driver(self.cookies, capture_images=self.capture_images)
     
     def extract_article_content(self, url):
-        """提取知乎文章内容"""
+        """提取知乎文章内容：依次加载页面、解析、下载图片
+
+        返回None时可通过last_block_state()查看是否被403/验证码/登录墙拦截。
+        增量模式下回答未变化时返回带unchanged标记的article_data，不含正文和图片。
+        流水线模式下这三步分别由fetch_page、parse_page、fetch_article_images在不同阶段执行。
+        """
+        page = self.fetch_page(url)
+        article_data = self.parse_page(page)
+        if page['block_state']:
+            # 浏览器遇到登录墙/验证码时仍会解析出空的article_data，按失败处理
+            return None
+        if article_data:
+            self.fetch_article_images(article_data)
+        return article_data
+    
+    def fetch_page(self, url):
+        """加载页面（流水线第一阶段），按self.engine选择HTTP快速路径或浏览器，返回page字典
+
+        page['article']不为空时表示增量模式下回答未变化，无需解析；
+        page['block_state']为加载时遇到的拦截状态，同时记录到当前线程。
+        """
+        self.local.block_state = None
+        page = {
+            'url': url,
+            'engine': None,
+            'html': None,
+            'initial_data': None,
+            'wait_time': None,
+            'browser_images': {},
+            'article': self.check_answer_unchanged(url),
+            'block_state': None,
+        }
+        if page['article']:
+            return page
+        if self.engine in ('http', 'auto'):
+            if self.fetch_page_http(page) or self.engine == 'http':
+                return page
+            if page['block_state'] in ('forbidden', 'captcha', 'rate_limited'):
+                # 被风控或限流时换浏览器访问同一主机也没用，直接交给调用方退避
+                return page
+            print("⚠️ HTTP快速路径不可用，回退到浏览器模式")
+            page['block_state'] = None
+            self.local.block_state = None
+        self.fetch_page_browser(page)
+        return page
+    
+    def parse_page(self, page):
+        """解析fetch_page返回的页面（流水线第二阶段），返回图片尚未下载的article_data
+
+        失败或被拦截时返回None，拦截状态记录到page和当前线程。
+        """
+        self.local.block_state = page['block_state']
+        if page['article']:
+            return page['article']
+        if page['block_state'] or not page['engine']:
+            return None
         try:
-            # 使用Selenium获取动态内容
-            if not self.driver:
-                self.init_driver()
-            
-            self.driver.get(url)
-            time.sleep(3)  # 等待页面加载
-            
-            # 等待内容加载
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "RichText"))
-            )
-            
-            # 滚动页面以加载懒加载的图片
-            self.scroll_page()
-            
-            # 等待图片加载
-            time.sleep(2)
-            
-            # 获取页面源码
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # 调试：检查页面中的图片
-            all_images = soup.find_all('img')
-            print(f"🔍 页面中共找到 {len(all_images)} 个图片元素")
-            for i, img in enumerate(all_images[:10]):  # 显示前10个
-                src = img.get('src', 'No src')
-                data_src = img.get('data-src', 'No data-src')
-                print(f"  图片{i+1}: src={src} | data-src={data_src}")
-            
-            # 提取文章信息
-            article_data = self.parse_article(soup, url)
-            
-            return article_data
-            
+            if page['engine'] == 'http':
+                return self.parse_initial_data(page['initial_data'], page['url'])
+            return self.parse_browser_page(page)
         except Exception as e:
-            print(f"提取文章内容失败: {e}")
+            print(f"解析页面失败: {e}")
             return None
     
-    def scroll_page(self):
-        """滚动页面以加载懒加载内容"""
+    def fetch_article_images(self, article_data):
+        """下载parse_page留下的待下载图片并按原文顺序拼回内容（流水线第三阶段）"""
+        pending_images = article_data.pop('pending_images', None)
+        browser_images = article_data.pop('browser_images', None)
+        if pending_images is not None:
+            article_data['blocks'], article_data['images'] = self.resolve_content_images(
+                article_data['blocks'], pending_images, browser_images)
+            article_data['content'] = blocks_to_html(article_data['blocks'])
+        return article_data
+    
+    def check_answer_unchanged(self, url):
+        """增量模式：先用轻量的回答接口比较updated_time，未变化时无需加载页面"""
+        if not self.metadata_store:
+            return None
+        _, answer_id = extract_question_answer_ids(url)
+        if not answer_id or not self.metadata_store.get(answer_id):
+            return None
         try:
-            # 滚动到页面底部
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            
-            # 滚动到页面顶部
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
+            response = self.http.get(f"{ZHIHU_BASE_URL}/api/v4/answers/{answer_id}?include=updated_time",
+                                     headers={'Accept': 'application/json'})
+            if response.status_code != 200:
+                return None
+            updated_time = response.json().get('updated_time')
         except Exception as e:
-            print(f"滚动页面失败: {e}")
+            print(f"⚠️ 检查回答更新时间失败: {e}")
+            return None
+        
+        article_data = self.new_article_data(url)
+        if self.mark_if_unchanged(article_data, updated_time=updated_time):
+            return article_data
+        return None
     
-    def parse_article(self, soup, url):
-        """解析文章内容"""
-        article_data = {
+    def new_article_data(self, url):
+        """创建空的article_data"""
+        _, answer_id = extract_question_answer_ids(url)
+        return {
             'url': url,
+            'answer_id': answer_id,
             'title': '',
             'author': '',
             'content': '',
             'images': [],
             'timestamp': get_timestamp()
         }
+    
+    def mark_if_unchanged(self, article_data, content_html=None, updated_time=None):
+        """记录回答的版本信息；增量模式下回答未变化时标记unchanged并返回True"""
+        if content_html is not None:
+            article_data['content_hash'] = hashlib.sha1(content_html.encode('utf-8')).hexdigest()
+        if updated_time is not None:
+            # 接口返回秒数、页面meta是ISO时间，统一存为秒数
+            article_data['updated_time'] = to_epoch_seconds(updated_time)
+        if not self.metadata_store:
+            return False
+        
+        record = self.metadata_store.is_unchanged(
+            article_data.get('answer_id'),
+            updated_time=article_data.get('updated_time'),
+            content_hash=article_data.get('content_hash'),
+        )
+        if not record:
+            return False
+        article_data.update({
+            'title': article_data['title'] or record.get('title', ''),
+            'author': article_data['author'] or record.get('author', ''),
+            'unchanged': True,
+            'pdf_path': record['pdf_path'],
+        })
+        print(f"⏭️ 回答 {article_data['answer_id']} 未变化，沿用 {record['pdf_path']}")
+        return True
+    
+    def detect_block_state(self, status_code=None, url='', page_source=''):
+        """判断响应是否为知乎的拦截页，返回 forbidden/rate_limited/captcha/login_wall 或None"""
+        if status_code == 403:
+            return 'forbidden'
+        if status_code == 429:
+            return 'rate_limited'
+        for marker, state in BLOCK_URL_MARKERS.items():
+            if marker in (url or ''):
+                return state
+        for marker, state in BLOCK_PAGE_MARKERS.items():
+            if marker in (page_source or ''):
+                return state
+        return None
+    
+    def record_block_state(self, state):
+        """记录当前线程遇到的拦截状态"""
+        self.local.block_state = state
+        if state:
+            print(f"🛑 知乎拦截: {state}")
+    
+    def last_block_state(self):
+        """返回当前线程最近一次提取遇到的拦截状态，未被拦截时为None"""
+        return getattr(self.local, 'block_state', None)
+    
+    def fetch_page_http(self, page):
+        """不启动浏览器，直接请求页面并取出内嵌的js-initialData，页面中有目标回答时返回True"""
+        url = page['url']
+        try:
+            start_time = time.time()
+            response = self.http.get(url)
+            block_state = self.detect_block_state(response.status_code, response.url)
+            if block_state:
+                page['block_state'] = block_state
+                self.record_block_state(block_state)
+                return False
+            if response.status_code != 200:
+                print(f"⚠️ 页面请求失败: HTTP {response.status_code}")
+                return False
+            
+            initial_data = extract_initial_data(response.text)
+            if not initial_data:
+                page['block_state'] = self.detect_block_state(page_source=response.text)
+                self.record_block_state(page['block_state'])
+                print("⚠️ 页面中未找到js-initialData")
+                return False
+            if not self.find_initial_answer(initial_data, url)[0]:
+                return False
+            
+            page.update(engine='http', initial_data=initial_data, wait_time=round(time.time() - start_time, 2))
+            print(f"⚡ HTTP快速路径加载完成，耗时 {page['wait_time']:.2f}s")
+            return True
+            
+        except Exception as e:
+            print(f"HTTP快速路径失败: {e}")
+            return False
+    
+    def find_initial_answer(self, initial_data, url):
+        """在initialData中查找目标回答，返回 (回答对象, 问题标题)，没有回答内容时回答为None"""
+        question_id, answer_id = extract_question_answer_ids(url)
+        entities = initial_data.get('initialState', {}).get('entities', {})
+        answer = entities.get('answers', {}).get(answer_id) if answer_id else None
+        if not answer or not answer.get('content'):
+            print(f"⚠️ initialData中没有回答内容: {answer_id}")
+            return None, ''
+        
+        question = answer.get('question') or {}
+        title = question.get('title') or entities.get('questions', {}).get(question_id, {}).get('title', '')
+        return answer, title
+    
+    def parse_initial_data(self, initial_data, url):
+        """从initialData中提取回答，生成与parse_article相同结构的article_data"""
+        answer, title = self.find_initial_answer(initial_data, url)
+        if not answer:
+            return None
+        return self.build_answer_article(answer, url, title)
+    
+    def build_answer_article(self, answer, url, title):
+        """把initialData或API返回的回答对象转换为article_data（图片由fetch_article_images下载）"""
+        article_data = self.new_article_data(url)
+        article_data['title'] = title
+        article_data['author'] = (answer.get('author') or {}).get('name', '')
+        
+        print(f"✅ 找到标题: {title}")
+        print(f"✅ 找到作者: {article_data['author']}")
+        updated_time = answer.get('updated_time', answer.get('updatedTime'))
+        if self.mark_if_unchanged(article_data, answer['content'], updated_time):
+            return article_data
+        content_elem = BeautifulSoup(answer['content'], HTML_PARSER)
+        self.fill_article_content(article_data, content_elem)
+        return article_data
+    
+    def iter_question_answers(self, question_id, skip_ids=None, limit=None):
+        """分页遍历问题下的所有回答，每拿到一个回答就生成一份article_data
+
+        使用知乎answers接口的paging.next游标翻页，逐个产出结果，不在内存中累积。
+        产出的article_data中图片尚未下载，需调用fetch_article_images。
+        skip_ids中的回答不会下载图片，直接跳过。
+        """
+        skip_ids = skip_ids or set()
+        next_url = (f"{ZHIHU_BASE_URL}/api/v4/questions/{question_id}/answers"
+                    f"?include={QUESTION_ANSWERS_INCLUDE}&limit={QUESTION_PAGE_SIZE}&offset=0&sort_by=default")
+        yielded = 0
+        page = 0
+        question_title = ''
+        
+        while next_url:
+            page += 1
+            try:
+                response = self.http.get(next_url, headers={'Accept': 'application/json'})
+            except OSError as e:
+                # 重试用尽后的网络错误（requests的ConnectionError/Timeout都是OSError的子类）
+                print(f"❌ 获取回答列表失败: {e.__class__.__name__} (第{page}页)，请稍后重新运行以继续")
+                return
+            block_state = self.detect_block_state(response.status_code, response.url)
+            if block_state:
+                self.record_block_state(block_state)
+                print(f"❌ 获取回答列表被拦截 (第{page}页)，请稍后重新运行以继续")
+                return
+            if response.status_code != 200:
+                print(f"❌ 获取回答列表失败: HTTP {response.status_code} (第{page}页)，请稍后重新运行以继续")
+                return
+            try:
+                payload = response.json()
+            except ValueError:
+                print(f"❌ 回答列表不是有效的JSON (第{page}页)，请稍后重新运行以继续")
+                return
+            answers = payload.get('data', [])
+            print(f"📄 第{page}页: {len(answers)} 个回答")
+            
+            for answer in answers:
+                answer_id = str(answer.get('id', ''))
+                if answer_id in skip_ids:
+                    continue
+                if not answer.get('content'):
+                    print(f"⚠️ 回答 {answer_id} 没有内容，已跳过")
+                    continue
+                question_title = (answer.get('question') or {}).get('title') or question_title
+                url = f"{ZHIHU_BASE_URL}/question/{question_id}/answer/{answer_id}"
+                yield self.build_answer_article(answer, url, question_title)
+                yielded += 1
+                if limit and yielded >= limit:
+                    return
+            
+            paging = payload.get('paging', {})
+            next_url = None if paging.get('is_end', True) else paging.get('next')
+    
+    def fetch_page_browser(self, page):
+        """使用Selenium渲染页面，源码保存到page中，成功返回True"""
+        url = page['url']
+        try:
+            # 使用Selenium获取动态内容，有浏览器池时从池中借出
+            if self.driver_pool:
+                with self.driver_pool.driver() as driver:
+                    self.driver_pool.record_page(driver)
+                    current_url = self.load_page_source(driver, page)
+            else:
+                if not self.driver:
+                    self.init_driver()
+                current_url = self.load_page_source(self.driver, page)
+            
+            page['engine'] = 'browser'
+            page['block_state'] = self.detect_block_state(url=current_url)
+            if page['block_state']:
+                self.record_block_state(page['block_state'])
+                return False
+            return True
+            
+        except Exception as e:
+            print(f"加载页面失败: {e}")
+            return False
+    
+    def parse_browser_page(self, page):
+        """解析浏览器渲染后的页面源码，返回article_data"""
+        url = page['url']
+        soup, parse_time = self.parse_page_source(page['html'], url)
+        
+        # 调试：检查页面中的图片
+        all_images = soup.find_all('img')
+        print(f"🔍 回答中共找到 {len(all_images)} 个图片元素")
+        for i, img in enumerate(all_images[:10]):  # 显示前10个
+            print(f"  图片{i+1}: {resolve_image_src(img) or '无可用URL'}")
+        
+        # 提取文章信息
+        article_data = self.parse_article(soup, url)
+        article_data['wait_time'] = page['wait_time']
+        article_data['parse_time'] = round(parse_time, 3)
+        if 'pending_images' in article_data:
+            article_data['browser_images'] = page['browser_images']
+        
+        if not article_data['content'] and not article_data.get('unchanged'):
+            # 页面正常打开但没有正文，多半是登录墙或验证页
+            page['block_state'] = self.detect_block_state(page_source=page['html'])
+            self.record_block_state(page['block_state'])
+        
+        return article_data
+    
+    def parse_page_source(self, page_source, url):
+        """用lxml解析页面，只对目标回答子树建树，返回 (soup, 解析耗时秒数)"""
+        start_time = time.time()
+        _, answer_id = extract_question_answer_ids(url)
+        fragment = extract_answer_fragment(page_source, answer_id)
+        if fragment:
+            soup = BeautifulSoup(fragment, HTML_PARSER)
+        else:
+            print("⚠️ 未定位到目标回答，解析整个页面")
+            soup = BeautifulSoup(page_source, HTML_PARSER)
+        parse_time = time.time() - start_time
+        print(f"⏱️ 页面解析耗时: {parse_time * 1000:.0f}ms")
+        return soup, parse_time
+    
+    def load_page_source(self, driver, page):
+        """在driver中打开页面，等待页面就绪后把源码和等待耗时写入page，返回最终URL"""
+        url = page['url']
+        self.http.rate_limiter.acquire(url)
+        if self.capture_images:
+            driver.get_log('performance')  # 丢弃上一个页面遗留的日志
+        driver.get(url)
+        wait_time = self.wait_for_page_ready(driver, url)
+        print(f"⏱️ 页面就绪等待耗时: {wait_time:.2f}s")
+        if self.capture_images:
+            # 响应体只在当前页面有效，必须在driver归还或跳转前取出
+            page['browser_images'] = self.harvest_browser_images(driver)
+        
+        # 获取页面源码
+        page['html'] = driver.page_source
+        page['wait_time'] = round(wait_time, 2)
+        return driver.current_url
+    
+    def harvest_browser_images(self, driver):
+        """从DevTools性能日志中取出浏览器已加载完成的图片响应体，返回 {image_key: (字节, content_type)}"""
+        responses = {}
+        finished = set()
+        try:
+            for entry in driver.get_log('performance'):
+                message = json.loads(entry['message'])['message']
+                params = message.get('params', {})
+                if message['method'] == 'Network.responseReceived' and params.get('type') == 'Image':
+                    response = params['response']
+                    if response.get('status') == 200 and response.get('mimeType', '').startswith('image/'):
+                        responses[params['requestId']] = (response['url'], response['mimeType'])
+                elif message['method'] == 'Network.loadingFinished':
+                    finished.add(params['requestId'])
+        except Exception as e:
+            print(f"⚠️ 读取浏览器网络日志失败: {e}")
+            return {}
+        
+        images = {}
+        for request_id, (image_url, mime_type) in responses.items():
+            if request_id not in finished:
+                continue
+            try:
+                body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception as e:
+                print(f"⚠️ 获取图片响应体失败 {image_url}: {e}")
+                continue
+            if body.get('base64Encoded'):
+                data = base64.b64decode(body['body'])
+            else:
+                data = body['body'].encode('utf-8')
+            if data and len(data) <= IMAGE_MAX_BYTES:
+                images[image_key(image_url)] = (data, mime_type)
+        print(f"🖼️ 从浏览器网络日志中取得 {len(images)}/{len(responses)} 张图片")
+        return images
+    
+    def wait_for_page_ready(self, driver, url):
+        """按实际条件等待页面就绪：目标回答出现、图片URL就绪、网络空闲，总时长不超过上限"""
+        start_time = time.time()
+        deadline = start_time + PAGE_READY_TIMEOUT
+        
+        # 等待目标回答的RichText出现（找不到指定回答时退回第一个RichText）
+        _, answer_id = extract_question_answer_ids(url)
+        selectors = ['.RichText']
+        if answer_id:
+            selectors.insert(0, f'.AnswerItem[name="{answer_id}"] .RichText')
+        
+        def find_rich_text(d):
+            for selector in selectors:
+                elements = d.find_elements(By.CSS_SELECTOR, selector)
+                if elements:
+                    return elements[0]
+            # 跳转到验证页或登录页时不必等到超时
+            if self.detect_block_state(url=d.current_url):
+                return 'blocked'
+            return False
+        
+        rich_text = WebDriverWait(driver, PAGE_READY_TIMEOUT, poll_frequency=0.2).until(find_rich_text)
+        if rich_text == 'blocked':
+            return time.time() - start_time
+        
+        if self.capture_images:
+            # 从网络日志取图片时，图片必须真正被浏览器加载，首屏以下的懒加载图片要逐个滚动到
+            self.scroll_all_images(driver, rich_text, deadline)
+        else:
+            # 图片真实URL已在data-*属性中时不需要滚动，只有拿不到URL的图片才滚动触发懒加载
+            pending = driver.execute_script(PENDING_IMAGES_SCRIPT, rich_text)
+            if pending:
+                self.scroll_page(driver, rich_text, deadline)
+            else:
+                print("✅ 图片URL均可从属性中解析，跳过滚动")
+        
+        self.wait_for_network_idle(driver, deadline)
+        return time.time() - start_time
+    
+    def scroll_page(self, driver, rich_text, deadline):
+        """逐步滚动到尚未加载的图片处，直到回答内所有图片都有真实URL"""
+        try:
+            for step in range(SCROLL_MAX_STEPS):
+                pending = driver.execute_script(PENDING_IMAGES_SCRIPT, rich_text)
+                if not pending or time.time() >= deadline:
+                    break
+                print(f"🔄 还有 {len(pending)} 张图片未加载，滚动第 {step + 1} 次")
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", pending[0])
+                
+                # 等待这张图片拿到真实URL
+                remaining = max(0.1, deadline - time.time())
+                try:
+                    WebDriverWait(driver, min(remaining, 2), poll_frequency=0.1).until(
+                        lambda d: pending[0] not in d.execute_script(PENDING_IMAGES_SCRIPT, rich_text)
+                    )
+                except TimeoutException:
+                    pass
+        except Exception as e:
+            print(f"滚动页面失败: {e}")
+    
+    def scroll_all_images(self, driver, rich_text, deadline):
+        """依次滚动到回答内的每张图片，等待浏览器加载完成，供harvest_browser_images取出"""
+        try:
+            images = driver.execute_script(CONTENT_IMAGES_SCRIPT, rich_text)
+            for index, img in enumerate(images):
+                if time.time() >= deadline:
+                    print(f"⚠️ 等待超时，{len(images) - index} 张图片未滚动加载")
+                    break
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", img)
+                remaining = max(0.1, deadline - time.time())
+                try:
+                    WebDriverWait(driver, min(remaining, 2), poll_frequency=0.1).until(
+                        lambda d: d.execute_script(IMAGE_LOADED_SCRIPT, img)
+                    )
+                except TimeoutException:
+                    pass
+            print(f"🔄 已滚动加载回答内 {len(images)} 张图片")
+        except Exception as e:
+            print(f"滚动页面失败: {e}")
+    
+    def wait_for_network_idle(self, driver, deadline):
+        """等待document加载完成且资源请求数在NETWORK_IDLE_MS内不再增长"""
+        idle_seconds = NETWORK_IDLE_MS / 1000
+        last_count = -1
+        stable_since = time.time()
+        while time.time() < deadline:
+            ready_state, count = driver.execute_script(NETWORK_STATE_SCRIPT)
+            now = time.time()
+            if count != last_count or ready_state != 'complete':
+                last_count = count
+                stable_since = now
+            elif now - stable_since >= idle_seconds:
+                return
+            time.sleep(0.1)
+    
+    def parse_article(self, soup, url):
+        """解析文章内容"""
+        article_data = self.new_article_data(url)
         
         try:
             print("🔍 开始解析文章内容...")
@@ -179,11 +662,17 @@ class ZhihuScraper:
                 '.ContentItem-content'
             ]
             
+            # 回答的最后修改时间，用于增量模式
+            modified_elem = soup.select_one('meta[itemprop="dateModified"]')
+            updated_time = modified_elem.get('content') if modified_elem else None
+            
             for selector in content_selectors:
                 content_elem = soup.select_one(selector)
                 if content_elem:
                     print(f"✅ 找到内容区域: {selector}")
-                    article_data['content'], article_data['images'] = self.process_content(content_elem)
+                    if self.mark_if_unchanged(article_data, str(content_elem), updated_time):
+                        return article_data
+                    self.fill_article_content(article_data, content_elem)
                     break
             
             # 如果没有找到内容，尝试更宽泛的选择器
@@ -193,7 +682,7 @@ class ZhihuScraper:
                 content_divs = soup.find_all('div', class_=lambda x: x and 'RichText' in x)
                 if content_divs:
                     content_elem = content_divs[0]
-                    article_data['content'], article_data['images'] = self.process_content(content_elem)
+                    self.fill_article_content(article_data, content_elem)
             
             print(f"📊 解析结果: 标题={len(article_data['title'])}字符, 作者={len(article_data['author'])}字符, 内容={len(article_data['content'])}字符")
             
@@ -220,43 +709,55 @@ class ZhihuScraper:
         return result
 
     def process_content(self, content_elem):
-        """递归处理知乎内容，保持图文顺序，收集所有有效图片"""
-        content_html = ""
-        images = []
-        
-        def walk(node):
-            nonlocal images
-            if getattr(node, 'name', None) == 'img':
-                src = node.get('src', '')
-                # 只处理有效图片
-                if src and src.startswith('http'):
-                    img_data = self.process_image(node)
-                    if img_data:
-                        images.append(img_data)
-                        # 在HTML中插入base64图片
-                        content_type = img_data['content_type']
-                        base64_data = img_data['base64_data']
-                        return f'<img src="data:{content_type};base64,{base64_data}" alt="{img_data["alt"]}" class="zhihu-image" />'
-                return ''  # 忽略无效图片
-            elif getattr(node, 'name', None) is not None:
-                # 递归处理子节点
-                inner = ''.join([walk(child) for child in node.children])
-                if node.name in ['p', 'li', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                    return f'<{node.name}>{inner}</{node.name}>'
-                elif node.name in ['ul', 'ol']:
-                    return f'<{node.name}>{inner}</{node.name}>'
-                elif node.name == 'br':
-                    return '<br>'
-                else:
-                    return inner
-            else:
-                # 文本节点
-                return str(node)
+        """递归处理知乎内容，保持图文顺序，收集并下载所有有效图片
 
-        content_html = walk(content_elem)
-        print(f"✅ 内容处理完成: {len(content_html)}字符, {len(images)}张图片")
+        先遍历节点树生成块列表并收集图片，再并发下载所有图片，
+        最后按原文顺序把图片ID填回图片块，返回 (内容HTML, 图片表)。
+        """
+        blocks, images = self.resolve_content_images(*self.collect_content_images(content_elem))
+        return blocks_to_html(blocks), images
+    
+    def collect_content_images(self, content_elem):
+        """遍历节点树生成块列表，图片块记录待下载列表中的下标，返回 (块列表, 待下载的img元素列表)"""
+        return html_to_blocks(content_elem)
+    
+    def fill_article_content(self, article_data, content_elem):
+        """解析正文：块列表交给PDF生成器，content保留HTML形式，待下载图片留给下一阶段"""
+        article_data['blocks'], article_data['pending_images'] = self.collect_content_images(content_elem)
+        article_data['content'] = blocks_to_html(article_data['blocks'])
+    
+    def resolve_content_images(self, blocks, pending_images, browser_images=None):
+        """并发下载collect_content_images收集的图片，把图片ID填回图片块，返回 (块列表, 图片表)"""
+        # 并发下载图片，结果顺序与待下载列表一致
+        results = self.process_images_concurrently(pending_images, browser_images)
+        images = [img_data for img_data in results if img_data]
+        # 图片块只引用图片ID，图片字节保存在images表中；下载失败的图片直接忽略
+        blocks = resolve_image_blocks(blocks, results)
+        
+        print(f"✅ 内容处理完成: {len(blocks)}个内容块, {len(images)}张图片")
         print(f"🔍 图片顺序: {[img['filename'] for img in images]}")
-        return content_html, images
+        return blocks, images
+    
+    def process_images_concurrently(self, img_elems, browser_images=None):
+        """使用线程池并发处理图片，返回与输入顺序一致的结果列表"""
+        if not img_elems:
+            return []
+        
+        workers = max(1, min(self.image_workers, len(img_elems)))
+        start_time = time.time()
+        print(f"📥 开始并发下载 {len(img_elems)} 张图片 (线程数: {workers})")
+        
+        # executor.map 按提交顺序返回结果，保证图文顺序
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda elem: self.process_image(elem, browser_images), img_elems))
+        
+        success = sum(1 for r in results if r)
+        print(f"✅ 图片下载完成: {success}/{len(img_elems)} 张, 耗时 {time.time() - start_time:.2f}s")
+        if self.image_cache:
+            stats = self.image_cache.stats()
+            print(f"📦 图片缓存: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+                  f"{stats['entries']} 个条目 ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+        return results
     
     def process_paragraph_content(self, p_elem):
         """处理段落内容，保持其中的图片顺序"""
@@ -268,10 +769,8 @@ class ZhihuScraper:
                 # 处理段落中的图片
                 img_data = self.process_image(child)
                 if img_data:
-                    # 在段落中插入base64图片
-                    content_type = img_data['content_type']
-                    base64_data = img_data['base64_data']
-                    content += f'<img src="data:{content_type};base64,{base64_data}" alt="{img_data["alt"]}" class="zhihu-image" />'
+                    # 在段落中插入图片引用
+                    content += image_tag(img_data)
             else:
                 # 其他元素递归处理
                 content += self.clean_rich_text(child)
@@ -289,9 +788,7 @@ class ZhihuScraper:
                     # 处理列表项中的图片
                     img_data = self.process_image(child)
                     if img_data:
-                        content_type = img_data['content_type']
-                        base64_data = img_data['base64_data']
-                        li_content += f'<img src="data:{content_type};base64,{base64_data}" alt="{img_data["alt"]}" class="zhihu-image" />'
+                        li_content += image_tag(img_data)
                 else:
                     # 其他元素递归处理
                     li_content += self.clean_rich_text(child)
@@ -299,76 +796,83 @@ class ZhihuScraper:
                 content += f"<li>{li_content.strip()}</li>"
         return content
     
-    def process_image(self, img_elem):
-        """处理图片元素，直接获取base64数据"""
+    def process_image(self, img_elem, browser_images=None):
+        """处理图片元素，下载原始字节并返回图片表条目
+
+        browser_images为浏览器网络日志中取到的图片，命中时不再下载。
+        """
         try:
-            # 尝试多种图片属性
-            src = None
-            for attr in ['src', 'data-src', 'data-original', 'data-actualsrc']:
-                src = img_elem.get(attr)
-                if src:
-                    print(f"🔍 找到图片源: {attr} = {src}")
-                    break
-            
-            if not src:
+            srcs = image_srcs(img_elem)
+            if not srcs:
                 print("⚠️ 未找到图片源")
                 return None
             
-            # 处理相对URL
-            if src.startswith('//'):
-                src = 'https:' + src
-            elif src.startswith('/'):
-                src = 'https://www.zhihu.com' + src
-            elif not src.startswith('http'):
-                src = 'https://www.zhihu.com' + src
+            # 浏览器实际加载的是data-actualsrc/src上的版本（常为_b），按元素上所有URL查找已加载的图片
+            loaded = [url for url in srcs if image_key(url) in (browser_images or {})]
+            src = loaded[0] if loaded else srcs[0]
+            
+            # 按PDF显示尺寸选择够用的最小图片版本（浏览器已加载的版本直接使用）
+            if not self.original_images and not loaded:
+                src = select_image_variant(src, self.image_dpi,
+                                           parse_int(img_elem.get('data-rawwidth')),
+                                           parse_int(img_elem.get('data-rawheight')))
             
             print(f"🔍 处理后的图片URL: {src}")
             
             # 直接下载图片到内存
-            img_data = self.download_image_to_memory(src)
+            img_data = self.download_image_to_memory(src, browser_images)
             if img_data:
-                return {
+                entry = {
+                    'id': image_key(src),
                     'original_url': src,
-                    'base64_data': img_data['base64'],
+                    'data': img_data['data'],
                     'content_type': img_data['content_type'],
                     'filename': img_data['filename'],
                     'alt': img_elem.get('alt', '')
                 }
+                if img_data.get('placeholder'):
+                    # 未嵌入的图片保留占位类型和原因（过大/动图），PDF中显示给读者
+                    entry['placeholder'] = img_data['placeholder']
+                    if img_data.get('reason'):
+                        entry['reason'] = img_data['reason']
+                return entry
             
         except Exception as e:
             print(f"❌ 处理图片失败: {e}")
         
         return None
     
-    def download_image_to_memory(self, url):
-        """下载图片到内存，返回base64数据"""
+    def download_image_to_memory(self, url, browser_images=None):
+        """下载图片到内存，返回原始字节（优先使用浏览器已加载的图片，其次读取本地图片缓存）
+
+        超过大小上限或是动图时按配置的策略处理，可能返回 placeholder 为 'link' 的占位条目。
+        """
         try:
-            print(f"📥 开始下载图片到内存: {url}")
-            
-            # 添加图片请求头
-            headers = {
-                'User-Agent': USER_AGENT,
-                'Referer': 'https://www.zhihu.com/',
-                'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            }
-            
-            response = self.session.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            # 检查内容类型
-            content_type = response.headers.get('content-type', 'image/jpeg')
-            if not content_type.startswith('image/'):
-                print(f"⚠️ 非图片内容: {content_type}")
-                return None
-            
-            # 获取图片数据
-            image_data = response.content
-            
-            # 转换为base64
-            import base64
-            base64_data = base64.b64encode(image_data).decode('utf-8')
+            harvested = browser_images.get(image_key(url)) if browser_images else None
+            cached = None
+            if not harvested and self.image_cache:
+                cached = self.image_cache.get(url)
+            if harvested:
+                print(f"🌐 使用浏览器已加载的图片: {url}")
+                # 浏览器取到的图片同样要检查像素上限和动图策略
+                result = self.check_image_bytes(url, *harvested)
+                if not result or result.get('placeholder'):
+                    return result
+                image_data, content_type = result['data'], result['content_type']
+                if self.image_cache:
+                    self.image_cache.put(url, image_data, content_type)
+            elif cached:
+                image_data, content_type = cached
+                print(f"📦 图片缓存命中: {url}")
+            else:
+                print(f"📥 开始下载图片到内存: {url}")
+                result = self.fetch_image_stream(url)
+                if not result or result.get('placeholder'):
+                    return result
+                image_data, content_type = result['data'], result['content_type']
+                
+                if self.image_cache:
+                    self.image_cache.put(url, image_data, content_type)
             
             # 生成文件名（用于调试）
             filename = generate_filename_from_url(url)
@@ -376,7 +880,7 @@ class ZhihuScraper:
             print(f"✅ 图片下载到内存成功: {filename} ({len(image_data)} bytes)")
             
             return {
-                'base64': base64_data,
+                'data': image_data,
                 'content_type': content_type,
                 'filename': filename
             }
@@ -385,7 +889,128 @@ class ZhihuScraper:
             print(f"❌ 下载图片到内存失败 {url}: {e}")
             return None 
     
+    def fetch_image_stream(self, url):
+        """流式下载图片，边下载边探测格式和尺寸
+
+        读取的字节数不超过 IMAGE_MAX_BYTES；超限或像素过多时按 IMAGE_OVERSIZE_POLICY 处理，
+        动图按 IMAGE_ANIMATED_POLICY 处理（GIF只下载到第一帧解码完成为止）。
+        返回 {'data', 'content_type'}，或链接占位条目，失败返回None。
+        """
+        # 添加图片请求头
+        headers = {
+            'User-Agent': USER_AGENT,
+            'Referer': 'https://www.zhihu.com/',
+            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+            'Accept-Encoding': 'gzip, deflate',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        }
+        
+        response = self.http.get(url, headers=headers, stream=True)
+        try:
+            response.raise_for_status()
+            
+            # 检查内容类型
+            content_type = response.headers.get('content-type', 'image/jpeg')
+            if not content_type.startswith('image/'):
+                print(f"⚠️ 非图片内容: {content_type}")
+                return None
+            
+            declared_size = parse_int(response.headers.get('content-length'))
+            if declared_size and declared_size > IMAGE_MAX_BYTES:
+                return self.handle_oversize_image(url, f"{declared_size} bytes")
+            
+            chunks = []
+            size = 0
+            probe = None   # (格式, 宽, 高, 是否动图)
+            parser = None  # 只在GIF动图取第一帧时使用
+            for chunk in response.iter_content(IMAGE_CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > IMAGE_MAX_BYTES:
+                    return self.handle_oversize_image(url, f"超过 {IMAGE_MAX_BYTES} bytes")
+                
+                if parser:
+                    parser.feed(chunk)
+                    if parser.finished:
+                        break
+                elif probe is None and size <= IMAGE_PROBE_BYTES:
+                    # 只读文件头探测尺寸，不分配像素内存
+                    probe = probe_image(b''.join(chunks))
+                    if probe:
+                        print(f"🔍 图片探测: {probe[0]} {probe[1]}x{probe[2]}{' 动图' if probe[3] else ''}")
+                        rejected = self.check_image_probe(url, probe)
+                        if rejected:
+                            return rejected
+                        if probe[3] and probe[0] == 'GIF' and IMAGE_ANIMATED_POLICY == 'first_frame':
+                            # 增量解码到第一帧完成即可停止下载
+                            parser = ImageFile.Parser()
+                            parser.feed(b''.join(chunks))
+                            if parser.finished:
+                                break
+            
+            if parser:
+                with parser.close() as img:
+                    print(f"🎞️ 动图只保留第一帧: {url} (已读取 {size} bytes)")
+                    return {'data': first_frame_png(img), 'content_type': 'image/png'}
+            
+            # 头部不足以探测的格式（如WebP）在下载完成后再检查
+            return self.check_image_bytes(url, b''.join(chunks), content_type, probe)
+        finally:
+            response.close()
+    
+    def check_image_bytes(self, url, image_data, content_type, probe=None):
+        """检查完整图片字节的像素上限和动图策略，返回 {'data', 'content_type'} 或替代结果"""
+        if probe is None:
+            probe = probe_image(image_data)
+            rejected = self.check_image_probe(url, probe) if probe else None
+            if rejected:
+                return rejected
+        if probe and probe[3] and IMAGE_ANIMATED_POLICY == 'first_frame':
+            with Image.open(io.BytesIO(image_data)) as img:
+                print(f"🎞️ 动图只保留第一帧: {url}")
+                return {'data': first_frame_png(img), 'content_type': 'image/png'}
+        return {'data': image_data, 'content_type': content_type}
+    
+    def check_image_probe(self, url, probe):
+        """根据探测结果检查像素上限和动图策略，需要拒绝时返回替代结果，否则返回None"""
+        image_format, width, height, animated = probe
+        if width * height > IMAGE_MAX_PIXELS:
+            return self.handle_oversize_image(url, f"{width}x{height} 像素")
+        if animated and IMAGE_ANIMATED_POLICY == 'link':
+            return self.link_placeholder(url, "动图")
+        return None
+    
+    def handle_oversize_image(self, url, reason):
+        """处理超过大小或像素上限的图片：优先改下更小的知乎图片版本，否则放原图链接"""
+        if IMAGE_OVERSIZE_POLICY == 'downscale':
+            smaller_url = smaller_image_variant(url)
+            if smaller_url:
+                print(f"📉 图片过大（{reason}），改下更小版本: {smaller_url}")
+                return self.fetch_image_stream(smaller_url)
+        return self.link_placeholder(url, f"图片过大（{reason}）")
+    
+    def link_placeholder(self, url, reason):
+        """生成不嵌入图片、只在PDF中放原图链接的占位条目"""
+        print(f"🔗 {reason}，PDF中只放链接: {url}")
+        return {
+            'data': None,
+            'content_type': None,
+            'filename': generate_filename_from_url(url),
+            'placeholder': 'link',
+            'reason': reason,
+        }
+    
+    def print_http_stats(self):
+        """打印HTTP请求和限流统计"""
+        stats = self.http.stats()
+        print(f"🌐 HTTP请求: {stats['requests']} 次, 重试 {stats['retries']} 次, 失败 {stats['failures']} 次, "
+              f"平均耗时 {stats['avg_latency']:.2f}s, 最长 {stats['max_latency']:.2f}s")
+        for pattern, waited in self.http.rate_limiter.stats().items():
+            print(f"🚦 限流等待 {pattern}: {waited:.1f}s")
+    
     def close(self):
-        """关闭资源"""
+        """关闭资源（浏览器池由创建者负责关闭）"""
+        self.http.close()
         if self.driver:
-            self.driver.quit() 
\ No newline at end of file
+            self.driver.quit()
+            self.driver = None 
\ No newline at end of file
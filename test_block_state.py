@@ -0,0 +1,64 @@
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+import requests
+
+from batch import BatchRunner
+from scraper import ZhihuScraper
+
+
+def make_response(status_code, url):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response._content = b''
+    return response
+
+
+class FakeController:
+    """记录拦截信号的并发控制器替身"""
+
+    def __init__(self):
+        self.blocks = []
+
+    @contextmanager
+    def slot(self):
+        yield
+
+    def on_block(self, state):
+        self.blocks.append(state)
+
+
+class RateLimitedFetchTest(unittest.TestCase):
+    """HTTP 429 不应回退到浏览器，而要交给批量任务的并发控制器退避"""
+
+    url = 'https://www.zhihu.com/question/1/answer/2'
+
+    def make_scraper(self):
+        scraper = ZhihuScraper(engine='auto', use_image_cache=False)
+        scraper.http.get = mock.Mock(return_value=make_response(429, self.url))
+        scraper.fetch_page_browser = mock.Mock()
+        return scraper
+
+    def test_auto_mode_does_not_fall_back_on_429(self):
+        scraper = self.make_scraper()
+        page = scraper.fetch_page(self.url)
+        self.assertEqual(page['block_state'], 'rate_limited')
+        self.assertEqual(scraper.last_block_state(), 'rate_limited')
+        scraper.fetch_page_browser.assert_not_called()
+
+    def test_429_reaches_controller(self):
+        runner = BatchRunner.__new__(BatchRunner)
+        runner.scraper = self.make_scraper()
+        runner.controller = FakeController()
+        item = runner.new_item({'id': '2', 'url': self.url})
+        with mock.patch('batch.BLOCK_RETRY_TIMES', 0):
+            runner.stage_fetch(item)
+        self.assertEqual(runner.controller.blocks, ['rate_limited'])
+        self.assertTrue(item['done'])
+        self.assertNotIn('page', item)
+
+
+if __name__ == '__main__':
+    unittest.main()
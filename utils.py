@@ -2,12 +2,17 @@ import os
 import re
 import time
 import hashlib
+from datetime import datetime, timezone, timedelta
 from urllib.parse import urlparse, urljoin
 import requests
 from PIL import Image
 import io
 import json
+import base64
+import html
 from bs4 import NavigableString, Tag
+from lxml import html as lxml_html
+from config import PDF_IMAGE_MAX_WIDTH, PDF_IMAGE_MAX_HEIGHT, ZHIHU_IMAGE_VARIANTS
 
 def create_directories():
     """创建必要的目录"""
@@ -70,10 +75,213 @@ def extract_question_answer_ids(url):
         return match.group(1), match.group(2)
     return None, None
 
+def extract_question_id(url):
+    """从知乎问题URL（/question/<qid>，可带/answer/<aid>）中提取问题ID"""
+    match = re.search(r'/question/(\d+)', url)
+    if match:
+        return match.group(1)
+    return None
+
+def extract_image_id(url):
+    """从知乎图片URL中提取v2-<hash>唯一标识"""
+    match = re.search(r'v2-([a-f0-9]+)_', url)
+    if match:
+        return match.group(1)
+    return None
+
+# 图片真实URL所在的属性，按优先级排列：知乎懒加载图片的src是占位图，真实URL在data-*属性里
+IMAGE_URL_ATTRS = ['data-original', 'data-actualsrc', 'data-src', 'src']
+
+def image_srcs(img_elem):
+    """按IMAGE_URL_ATTRS的顺序返回img标签上所有可用的图片URL（已补全为绝对地址，去重）"""
+    srcs = []
+    for attr in IMAGE_URL_ATTRS:
+        src = (img_elem.get(attr) or '').strip()
+        # 跳过data:占位图（知乎懒加载用内联SVG占位）
+        if not src or src.startswith('data:'):
+            continue
+        if src.startswith('//'):
+            src = 'https:' + src
+        elif not src.startswith('http'):
+            src = 'https://www.zhihu.com' + ('' if src.startswith('/') else '/') + src
+        if src not in srcs:
+            srcs.append(src)
+    return srcs
+
+def resolve_image_src(img_elem):
+    """从img标签的懒加载属性中解析图片真实URL并补全为绝对地址，没有可用URL时返回None"""
+    srcs = image_srcs(img_elem)
+    return srcs[0] if srcs else None
+
+def parse_int(value):
+    """把属性值转换为整数，无法转换时返回None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def required_image_width(dpi, raw_width=None, raw_height=None):
+    """按PDF中的最大显示框和目标DPI计算图片需要的像素宽度"""
+    display_width = PDF_IMAGE_MAX_WIDTH
+    if raw_width and raw_height:
+        # 高图受显示框高度限制，实际显示宽度更小
+        display_width = min(PDF_IMAGE_MAX_WIDTH, PDF_IMAGE_MAX_HEIGHT * raw_width / raw_height)
+    return int(display_width * dpi)
+
+def select_image_variant(url, dpi, raw_width=None, raw_height=None):
+    """把知乎图片URL改写为满足目标DPI的最小尺寸版本（_720w/_1440w/_r）
+
+    非知乎v2图片URL原样返回。原图本身比需要的尺寸小时，选能容纳原图的最小版本。
+    """
+    match = re.search(r'(v2-[a-f0-9]+)(?:_\w+)?(\.\w+)', url)
+    if not match:
+        return url
+    needed = required_image_width(dpi, raw_width, raw_height)
+    if raw_width:
+        needed = min(needed, raw_width)
+    variant = 'r'
+    for suffix, width in ZHIHU_IMAGE_VARIANTS:
+        if width >= needed:
+            variant = suffix
+            break
+    return url[:match.start()] + f"{match.group(1)}_{variant}{match.group(2)}" + url[match.end():]
+
+def smaller_image_variant(url):
+    """返回比当前尺寸小一档的知乎图片URL（_r -> _1440w -> _720w），没有更小版本时返回None"""
+    match = re.search(r'(v2-[a-f0-9]+)(?:_(\w+))?(\.\w+)', url)
+    if not match:
+        return None
+    suffixes = [suffix for suffix, _ in ZHIHU_IMAGE_VARIANTS]
+    current = match.group(2)
+    if current in suffixes:
+        index = suffixes.index(current)
+        if index == 0:
+            return None
+        smaller = suffixes[index - 1]
+    else:
+        # 原图（_r）或无后缀，退到最大的缩略版本
+        smaller = suffixes[-1]
+    return url[:match.start()] + f"{match.group(1)}_{smaller}{match.group(3)}" + url[match.end():]
+
+def is_animated_image(head, image_format):
+    """根据文件头部字节判断是否为动图（GIF循环扩展、动画WebP、APNG）"""
+    if image_format == 'GIF':
+        return b'NETSCAPE2.0' in head
+    if image_format == 'WEBP':
+        return head[12:16] == b'VP8X' and len(head) > 20 and bool(head[20] & 0x02)
+    if image_format == 'PNG':
+        idat = head.find(b'IDAT')
+        return b'acTL' in (head[:idat] if idat >= 0 else head)
+    return False
+
+def probe_image(head):
+    """只读文件头探测图片，返回 (格式, 宽, 高, 是否动图)；数据不足或无法识别时返回None"""
+    try:
+        with Image.open(io.BytesIO(head)) as img:
+            return img.format, img.width, img.height, is_animated_image(head, img.format)
+    except Exception:
+        return None
+
+def first_frame_png(img):
+    """把动图的第一帧编码为PNG字节"""
+    img.seek(0)
+    frame = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    buffer = io.BytesIO()
+    frame.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+def image_key(url):
+    """生成图片的内容寻址ID：优先使用知乎的v2-<hash>图片ID，否则使用URL哈希
+
+    同一图片ID的不同尺寸（_720w、_r等）内容不同，因此ID中保留尺寸后缀。
+    """
+    image_id = extract_image_id(url)
+    if image_id:
+        variant = re.search(r'v2-[a-f0-9]+_(\w+)', url)
+        return f"v2-{image_id}_{variant.group(1)}" if variant else f"v2-{image_id}"
+    return 'url-' + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def image_tag(img_data):
+    """生成引用图片表条目的<img>标签，内容中只保存图片ID，不内嵌图片数据"""
+    alt = html.escape(img_data.get('alt', ''), quote=True)
+    return f'<img data-image-id="{img_data["id"]}" alt="{alt}" class="zhihu-image" />'
+
+def article_to_json(article_data, embed_images=False):
+    """把article_data转换为可JSON序列化的dict
+
+    图片原始字节不能直接写入JSON：embed_images为True时转为base64生成自包含文件，
+    否则只保留图片元数据。
+    """
+    export = dict(article_data)
+    images = []
+    for img in article_data.get('images', []):
+        record = {k: v for k, v in img.items() if k != 'data'}
+        record['size'] = len(img.get('data') or b'')
+        if embed_images and img.get('data'):
+            record['base64_data'] = base64.b64encode(img['data']).decode('ascii')
+        images.append(record)
+    export['images'] = images
+    return export
+
+def image_placeholder(index):
+    """生成图片占位符，用于并发下载完成前在内容中标记图片位置"""
+    return f'\x00IMG{index}\x00'
+
+def extract_initial_data(html):
+    """从知乎页面HTML中提取js-initialData脚本里的JSON数据"""
+    match = re.search(r'<script[^>]*id="js-initialData"[^>]*>(.*?)</script>', html, re.S)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError as e:
+        print(f"⚠️ 解析initialData失败: {e}")
+        return None
+
+def extract_answer_fragment(page_source, answer_id):
+    """用lxml定位问题标题和目标回答，只返回这一小段HTML
+
+    知乎页面包含大量侧边栏、推荐流和脚本，只把需要的子树交给BeautifulSoup，
+    避免对整个页面建树。找不到目标回答时返回None。
+    """
+    if not answer_id:
+        return None
+    tree = lxml_html.fromstring(page_source)
+    answers = tree.xpath(
+        '//div[contains(concat(" ", normalize-space(@class), " "), " AnswerItem ") and @name=$aid]',
+        aid=answer_id
+    )
+    if not answers:
+        return None
+    titles = tree.xpath('//h1[contains(concat(" ", normalize-space(@class), " "), " QuestionHeader-title ")]')
+    parts = [lxml_html.tostring(elem, encoding='unicode') for elem in titles[:1] + answers[:1]]
+    return '<div>' + ''.join(parts) + '</div>'
+
 def get_timestamp():
     """获取当前时间戳，格式：2025-07-26（只保留日期）"""
     return time.strftime("%Y-%m-%d")
 
+def to_epoch_seconds(value):
+    """把回答的更新时间统一为Unix秒数
+
+    知乎接口返回秒数（整数），页面meta[itemprop=dateModified]是ISO时间字符串，
+    统一格式后两种来源的更新时间才能直接比较。无法识别时返回None。
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone(timedelta(hours=8)))  # 没有时区的按北京时间处理
+    return int(parsed.timestamp())
+
 def load_cookies_from_json(cookie_file):
     """从JSON文件加载cookies"""
     try: